@@ -2,9 +2,10 @@ import json
 import sys
 import textwrap
 from argparse import ArgumentParser, RawDescriptionHelpFormatter
-from typing import Sized, SupportsIndex
+from typing import Sized
 
 from . import Press, __homepage__, __version__, layout, renderer
+from .embed import ENCODINGS
 
 
 def get_formats() -> str:
@@ -39,15 +40,54 @@ def resolution(v: str) -> tuple[float, float]:
     )
 
 
-def page_ranges(v: str) -> list[int | SupportsIndex]:
-    pages = []
-    a = v.split(",")
-    for x in a:
-        try:
-            pages.append(int(x))
-        except:
-            pages.append(range(*map(int, x.split("-"))))
-    return pages
+def page_ranges(v: str) -> renderer.PageRanges:
+    return renderer.PageRanges.parse(v)
+
+
+def jobs_option(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        help="number of processes to render the pages with, defaults to 1",
+        default=1,
+        type=int,
+    )
+
+
+def colorspace_option(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "-c",
+        "--colorspace",
+        help="colorspace to render the pages in, 'gray' and 'mono' (black and white) produce much smaller outputs, defaults to rgb",
+        default="rgb",
+        choices=renderer.COLORSPACES,
+    )
+
+
+def max_upscale_option(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "--max-upscale",
+        help="never render pages made of a single image (like scans) larger than this many times their own resolution, 1 keeps such pages at their own resolution, by default pages are always rendered at the given resolution",
+        default=None,
+        type=float,
+    )
+
+
+def encoding_options(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "-e",
+        "--encoding",
+        help="encoding of the rendered pages in the output pdf, 'flate' is lossless, 'jpeg' and 'jpx' (jpeg 2000) are lossy and much smaller for photos and scans, defaults to flate",
+        default="flate",
+        choices=ENCODINGS,
+    )
+    parser.add_argument(
+        "-q",
+        "--quality",
+        help="quality of jpeg and jpx encoded pages from 1 to 100, defaults to 85",
+        default=85,
+        type=int,
+    )
 
 
 def minlen1input(v: Sized) -> Sized:
@@ -142,6 +182,23 @@ intensive.
         default=None,
         type=page_ranges,
     )
+    subparser_press.add_argument(
+        "--cache-dir",
+        help="keep the rendered pages in this folder and reuse them in later runs with the same input files and render sizes",
+        default=None,
+    )
+    subparser_press.add_argument(
+        "--cache-size",
+        help="maximum size of the cache folder in megabytes, least recently used renders are removed first, defaults to 1024",
+        default=1024,
+        type=float,
+    )
+    subparser_press.add_argument(
+        "--max-open-documents",
+        help="keep at most this many input documents open at once, the least recently used ones are closed and opened again when needed, defaults to 64",
+        default=None,
+        type=int,
+    )
 
     # Subparsers at `press`
     press_subparsers = subparser_press.add_subparsers(
@@ -182,6 +239,15 @@ intensive.
             help="flip even pages horizontally by rotating them 180 degrees",
             action="store_true",
         )
+        jobs_option(parser)
+        colorspace_option(parser)
+        encoding_options(parser)
+        max_upscale_option(parser)
+        parser.add_argument(
+            "--vector",
+            help="place the pages of pdf like inputs as vector content instead of rendering them to images, reduces output size and render time",
+            action="store_true",
+        )
 
     # parser `press midpage`
     midpage_parser = press_subparsers.add_parser(
@@ -190,6 +256,12 @@ intensive.
     )
     midpage_parser.add_argument("output", help="path to output pdf file")
     midpage_common_options(midpage_parser)
+    midpage_parser.add_argument(
+        "--flush-every",
+        help="write the finished sheets to the output every this many sheets, so that long books don't have to be held in memory, by default the output is written at the end",
+        default=0,
+        type=int,
+    )
 
     # parser `press midpage-multi`
     midpage_multi_parser = press_subparsers.add_parser(
@@ -217,6 +289,7 @@ intensive.
         "--stack-size",
         help="number of pages per stack, this may be increased by 1 to eliminate an ending smaller stack, defaults to 40",
         default=40,
+        type=int,
     )
 
     # parser `press merge`
@@ -231,6 +304,15 @@ intensive.
         type=resolution,
         default=(1600, 1600),
     )
+    jobs_option(merge_parser)
+    colorspace_option(merge_parser)
+    encoding_options(merge_parser)
+    max_upscale_option(merge_parser)
+    merge_parser.add_argument(
+        "--vector",
+        help="copy the pages of pdf like inputs as is instead of rendering them to images, the resolution then only applies to image inputs",
+        action="store_true",
+    )
 
     # parser `press images`
     image_parser = press_subparsers.add_parser(
@@ -266,6 +348,8 @@ intensive.
         metavar="KEY=VALUE",
         type=pil_arg,
     )
+    jobs_option(image_parser)
+    colorspace_option(image_parser)
 
     # parser `press text`
     text_pareser = press_subparsers.add_parser(
@@ -287,7 +371,14 @@ intensive.
     match args._root_command:
         case "press":
             minlen1input(args.input)
-            press = Press(args.input, args.ignore_errors, args.pages)
+            press = Press(
+                args.input,
+                args.ignore_errors,
+                args.pages,
+                cache_dir=args.cache_dir,
+                cache_dir_bytes=int(args.cache_size * 2**20),
+                max_open_documents=args.max_open_documents,
+            )
             match args._press_command:
                 case "midpage-multi":
                     press.progress_midpage_multi(
@@ -297,6 +388,12 @@ intensive.
                         ppi=args.ppi,
                         rtl=args.rtl,
                         flip_even=args.flip_even,
+                        workers=args.jobs,
+                        vector=args.vector,
+                        colorspace=args.colorspace,
+                        encoding=args.encoding,
+                        quality=args.quality,
+                        max_upscale=args.max_upscale,
                         separate_stacks=args.separate_stacks,
                         stack_prefix=args.stack_prefix,
                         stack_size=args.stack_size,
@@ -309,11 +406,24 @@ intensive.
                         ppi=args.ppi,
                         rtl=args.rtl,
                         flip_even=args.flip_even,
+                        workers=args.jobs,
+                        vector=args.vector,
+                        colorspace=args.colorspace,
+                        encoding=args.encoding,
+                        quality=args.quality,
+                        max_upscale=args.max_upscale,
+                        flush_every=args.flush_every,
                     ).sync_with_progress_bar()
                 case "merge":
                     press.progress_merge(
                         args.output,
                         resolution=args.resolution,
+                        workers=args.jobs,
+                        vector=args.vector,
+                        colorspace=args.colorspace,
+                        encoding=args.encoding,
+                        quality=args.quality,
+                        max_upscale=args.max_upscale,
                     ).sync_with_progress_bar()
                 case "images":
                     press.progress_images(
@@ -321,6 +431,8 @@ intensive.
                         resolution=args.resolution,
                         file_prefix=args.file_prefix,
                         format=args.format,
+                        workers=args.jobs,
+                        colorspace=args.colorspace,
                         **dict(args.pil),
                     ).sync_with_progress_bar()
                 case "text":
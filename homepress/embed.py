@@ -0,0 +1,120 @@
+"""
+Encoding of rendered pixmaps as pdf images and their placement on pdf pages
+"""
+
+import hashlib
+import io
+import zlib
+from typing import Literal
+
+import PIL.Image
+import pymupdf
+
+from .renderer.colorspace import Colorspace
+from .renderer.renderer_abc import EncodedImage
+
+type Encoding = Literal["flate", "jpeg", "jpx"]
+
+ENCODINGS: tuple[Encoding, ...] = ("flate", "jpeg", "jpx")
+
+# Raw pixmap samples as (n, width, height, samples, alpha), see `parallel`
+type PackedPixmap = tuple[int, int, int, bytes, bool]
+
+
+def check_encoding(encoding: str, quality: int) -> None:
+    if encoding not in ENCODINGS:
+        raise ValueError(
+            f"Unknown encoding {encoding!r}, valid values are {', '.join(ENCODINGS)}"
+        )
+    if not 1 <= quality <= 100:
+        raise ValueError(f"Quality has to be between 1 and 100: {quality}")
+
+
+def encode_image(
+    packed: PackedPixmap,
+    colorspace: Colorspace = "rgb",
+    encoding: Encoding = "flate",
+    quality: int = 85,
+) -> EncodedImage:
+    """
+    Encode the samples of a pixmap without alpha as a pdf image. `quality` (1 to 100)
+    only applies to the lossy jpeg and jpx encodings. Pixmaps in the mono colorspace are
+    always stored with flate at 1 bit per pixel.
+
+    This only works on plain bytes, so it can run in other threads alongside rendering.
+    """
+    n, w, h, samples, _ = packed
+    mode = "L" if n == 1 else "RGB"
+    pdf_colorspace = "DeviceGray" if n == 1 else "DeviceRGB"
+
+    if colorspace == "mono":
+        im = PIL.Image.frombytes("L", (w, h), samples)
+        im = im.convert("1", dither=PIL.Image.Dither.NONE)
+        return EncodedImage(
+            w, h, "DeviceGray", 1, "FlateDecode", zlib.compress(im.tobytes())
+        )
+
+    if encoding == "flate":
+        return EncodedImage(
+            w, h, pdf_colorspace, 8, "FlateDecode", zlib.compress(samples)
+        )
+
+    im = PIL.Image.frombytes(mode, (w, h), samples)
+    buffer = io.BytesIO()
+    if encoding == "jpeg":
+        im.save(buffer, "JPEG", quality=quality)
+        filter = "DCTDecode"
+    else:
+        # Quality is mapped to a target compression ratio, from 100:1 down to 1:1
+        im.save(
+            buffer,
+            "JPEG2000",
+            irreversible=True,
+            quality_mode="rates",
+            quality_layers=[101 - quality],
+        )
+        filter = "JPXDecode"
+    return EncodedImage(w, h, pdf_colorspace, 8, filter, buffer.getvalue())
+
+
+def insert_encoded(
+    page: pymupdf.Page,
+    rect: pymupdf.Rect,
+    image: EncodedImage,
+    rotate: int = 0,
+    xrefs: dict[tuple, int] = None,
+) -> int:
+    """
+    Insert the encoded image fitted within `rect` of `page` and return its xref. The
+    encoded data is stored as is. The image is rotated counterclockwise by `rotate` in
+    addition to its own rotation.
+
+    `xrefs` maps the images inserted into the document before to their xrefs, an image
+    identical to one of them reuses its xref instead of being stored again. It has to be
+    kept per document.
+    """
+    doc = page.parent
+
+    if xrefs is not None:
+        key = (*image[:5], image.decode_parms, hashlib.sha1(image.data).digest())
+        if (xref := xrefs.get(key)) is not None:
+            page.insert_image(rect, xref=xref, rotate=(rotate + image.rotate) % 360)
+            return xref
+
+    xref = doc.get_new_xref()
+    doc.update_object(
+        xref,
+        f"<< /Type /XObject /Subtype /Image /Width {image.width} /Height {image.height}"
+        f" /ColorSpace /{image.colorspace} /BitsPerComponent {image.bpc} >>",
+    )
+    doc.update_stream(xref, image.data, compress=False)
+    # Updating the stream removes the filter and its parameters, as it assumes the data
+    # isn't encoded
+    doc.xref_set_key(xref, "Filter", f"/{image.filter}")
+    if image.decode_parms:
+        doc.xref_set_key(xref, "DecodeParms", image.decode_parms)
+    page.insert_image(rect, xref=xref, rotate=(rotate + image.rotate) % 360)
+
+    if xrefs is not None:
+        xrefs[key] = xref
+    return xref
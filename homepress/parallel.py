@@ -0,0 +1,268 @@
+"""
+Helpers to render pages of a `Renderer` across a pool of worker processes
+"""
+
+import itertools
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable, Iterator
+
+import pymupdf
+
+from .embed import EncodedImage, Encoding, PackedPixmap, encode_image
+from .renderer import Renderer
+from .renderer.colorspace import Colorspace
+from .renderer.renderer_abc import Size
+
+# Each worker process holds its own copy of the renderer (and hence its own open documents)
+_worker_renderer: Renderer = None
+
+_colorspaces = {1: pymupdf.csGRAY, 3: pymupdf.csRGB, 4: pymupdf.csCMYK}
+
+
+def _pack_pixmap(pixmap: pymupdf.Pixmap) -> PackedPixmap:
+    """
+    Pixmaps can't be pickled, so they are sent across processes as raw samples
+    """
+    n = pixmap.colorspace.n if pixmap.colorspace else 0
+    return (n, pixmap.width, pixmap.height, pixmap.samples, bool(pixmap.alpha))
+
+
+def _unpack_pixmap(packed: PackedPixmap) -> pymupdf.Pixmap:
+    n, w, h, samples, alpha = packed
+    return pymupdf.Pixmap(_colorspaces.get(n), w, h, samples, alpha)
+
+
+def _init_worker(renderer: Renderer) -> None:
+    global _worker_renderer
+    _worker_renderer = renderer
+
+
+def worker_renderer() -> Renderer:
+    """
+    The renderer of the current worker process, for tasks submitted to a `worker_pool`
+    """
+    return _worker_renderer
+
+
+def worker_pool(renderer: Renderer, workers: int) -> ProcessPoolExecutor:
+    """
+    Create a pool of `workers` processes, each holding its own copy of the renderer
+    which is available to the submitted tasks through `worker_renderer()`. Get the
+    results of the tasks with `worker_result`.
+
+    The processes are started with the spawn method, which imports the main module of
+    the program again in every process, so scripts have to guard their top level code
+    with `if __name__ == "__main__":`
+    """
+    return ProcessPoolExecutor(
+        workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(renderer,),
+    )
+
+
+def worker_result[T](future: Future[T]) -> T:
+    """
+    The result of a task submitted to a `worker_pool`. A pool whose processes died is
+    most likely used from a script without a main guard, which is pointed out
+    """
+    try:
+        return future.result()
+    except BrokenProcessPool as e:
+        raise BrokenProcessPool(
+            "A worker process terminated abruptly. Worker processes import the main "
+            "module again, so scripts using more than one worker have to run the press "
+            'within `if __name__ == "__main__":`'
+        ) from e
+
+
+def _in_order[T](futures: Iterable[Future[T]], window: int) -> Iterator[T]:
+    """
+    Yield the results of the futures in order. The futures are expected to be submitted
+    lazily as they are iterated, at most `window` of them are pending at a time.
+    """
+    pending = deque()
+    for x in futures:
+        pending.append(x)
+        if len(pending) >= window:
+            yield worker_result(pending.popleft())
+
+    while pending:
+        yield worker_result(pending.popleft())
+
+
+def _render_or_extract(
+    renderer: Renderer,
+    pages: Iterable[int],
+    size: Size,
+    sizes: dict[int, Size],
+    colorspace: Colorspace,
+    batch_size: int = 16,
+) -> Iterator[PackedPixmap | EncodedImage]:
+    """
+    Yields the encoded image of the pages that can be used as is (see
+    `Renderer.extract_image`) and renders the others at `size`, or at their own size in
+    `sizes`. Consecutive rendered pages of the same size are rendered as a batch.
+    """
+    batch = []
+    batch_page_size = None
+    for x in pages:
+        page_size = sizes.get(x, size) if sizes else size
+        image = renderer.extract_image(x, page_size, colorspace)
+
+        if batch and (
+            image is not None
+            or page_size != batch_page_size
+            or len(batch) >= batch_size
+        ):
+            yield from map(
+                _pack_pixmap, renderer.render_many(batch, batch_page_size, colorspace)
+            )
+            batch = []
+
+        if image is not None:
+            yield image
+        else:
+            batch.append(x)
+            batch_page_size = page_size
+
+    if batch:
+        yield from map(
+            _pack_pixmap, renderer.render_many(batch, batch_page_size, colorspace)
+        )
+
+
+def _encode(
+    x: PackedPixmap | EncodedImage,
+    colorspace: Colorspace,
+    encoding: Encoding,
+    quality: int,
+) -> EncodedImage:
+    if isinstance(x, EncodedImage):
+        return x
+    return encode_image(x, colorspace, encoding, quality)
+
+
+def _render_batch(
+    pages: list[int], size: Size, colorspace: Colorspace
+) -> list[PackedPixmap]:
+    return [
+        _pack_pixmap(x) for x in _worker_renderer.render_many(pages, size, colorspace)
+    ]
+
+
+def render_pages(
+    renderer: Renderer,
+    pages: Iterable[int],
+    size: Size,
+    workers: int = 1,
+    batch_size: int = 4,
+    colorspace: Colorspace = "rgb",
+) -> Iterator[pymupdf.Pixmap]:
+    """
+    Render the given pages in `colorspace` and yield the pixmaps in the same order as
+    `pages`.
+
+    If `workers` is more than 1, the pages are rendered across a pool of `workers`
+    processes, each holding its own copy of the renderer and rendering `batch_size`
+    pages per task. Only a small window of pages is rendered ahead of the consumer so
+    that memory stays bounded.
+    """
+    if workers <= 1:
+        yield from renderer.render_many(pages, size, colorspace)
+        return
+
+    pool = worker_pool(renderer, workers)
+    try:
+        batches = _in_order(
+            (
+                pool.submit(_render_batch, list(x), size, colorspace)
+                for x in itertools.batched(pages, batch_size)
+            ),
+            workers * 2,
+        )
+        for x in batches:
+            yield from map(_unpack_pixmap, x)
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+def _render_encoded_batch(
+    pages: list[int],
+    size: Size,
+    sizes: dict[int, Size],
+    colorspace: Colorspace,
+    encoding: Encoding,
+    quality: int,
+) -> list[EncodedImage]:
+    return [
+        _encode(x, colorspace, encoding, quality)
+        for x in _render_or_extract(_worker_renderer, pages, size, sizes, colorspace)
+    ]
+
+
+def render_encoded(
+    renderer: Renderer,
+    pages: Iterable[int],
+    size: Size,
+    workers: int = 1,
+    batch_size: int = 4,
+    colorspace: Colorspace = "rgb",
+    encoding: Encoding = "flate",
+    quality: int = 85,
+    sizes: dict[int, Size] = None,
+    threads: int = None,
+) -> Iterator[EncodedImage]:
+    """
+    Same as `render_pages`, except that the pages are encoded as pdf images (see
+    `embed.encode_image`) and yielded as such. Pages in `sizes` are rendered at their
+    own size instead of `size`.
+
+    With a single worker, the pages are encoded by `threads` threads while the next pages
+    are being rendered, at most twice as many pages as threads are rendered ahead. It
+    defaults to 2, and to 1 within worker processes (like the stacks of `midpage_multi`)
+    which already run in parallel to each other. Otherwise the worker processes encode
+    the pages they render.
+    """
+    if workers <= 1:
+        if threads is None:
+            threads = 1 if _worker_renderer is not None else 2
+        with ThreadPoolExecutor(threads) as pool:
+            # Samples are copied out of the pixmaps before they are handed to the
+            # threads, pymupdf objects are only touched by this thread
+            yield from _in_order(
+                (
+                    pool.submit(_encode, x, colorspace, encoding, quality)
+                    for x in _render_or_extract(
+                        renderer, pages, size, sizes, colorspace
+                    )
+                ),
+                threads * 2,
+            )
+        return
+
+    pool = worker_pool(renderer, workers)
+    try:
+        batches = _in_order(
+            (
+                pool.submit(
+                    _render_encoded_batch,
+                    list(x),
+                    size,
+                    {y: sizes[y] for y in x if y in sizes} if sizes else None,
+                    colorspace,
+                    encoding,
+                    quality,
+                )
+                for x in itertools.batched(pages, batch_size)
+            ),
+            workers * 2,
+        )
+        for x in batches:
+            yield from x
+    finally:
+        pool.shutdown(cancel_futures=True)
@@ -1,14 +1,29 @@
+import contextlib
 import io
-import shutil
+import itertools
+import tempfile
 from pathlib import Path
-from typing import Any, BinaryIO, SupportsIndex
+from typing import Any, BinaryIO, Iterable
 
 import pymupdf
 
-from . import bindermath, progress
+from . import bindermath, parallel, progress
+from .embed import check_encoding, insert_encoded
 from .layout import pages
+from .parallel import render_encoded, render_pages
 from .progress import Progress
-from .renderer import PageRangeRenderer, Renderer, get_renderer
+from .renderer import (
+    CachedRenderer,
+    DiskCache,
+    DocumentPool,
+    PageRangeRenderer,
+    Renderer,
+    get_renderer,
+)
+from .renderer.colorspace import bilevel_image, check_colorspace
+from .renderer.page_range_renderer import PageSelection
+from .renderer.renderer_abc import Size
+from .writer import PDFWriter
 
 
 def _flatten[T](l: list[list[T]]) -> list[T]:
@@ -35,23 +50,90 @@ def _set_defaults_and_check_unknown(
                 raise TypeError(f"Unrecognised options {x}")
 
 
+def _check_max_upscale(max_upscale: float | None) -> None:
+    if max_upscale is not None and max_upscale <= 0:
+        raise ValueError(f"Maximum upscale has to be positive: {max_upscale}")
+
+
+def _capped_sizes(
+    renderer: Renderer, page_numbers: Iterable[int], size: Size, max_upscale: float
+) -> dict[int, Size]:
+    """
+    Sizes for the pages that would be upscaled more than `max_upscale` times from their
+    native size (see `Renderer.native_size`) when rendered at `size`
+    """
+    sizes = {}
+    for x in page_numbers:
+        native = renderer.native_size(x)
+        if native is None:
+            continue
+        limit = (native[0] * max_upscale, native[1] * max_upscale)
+        if pages.clip(native, size)[0] > limit[0]:
+            sizes[x] = limit
+    return sizes
+
+
+def _add_stack_ppi(
+    page_ppi: dict[int, float], metrics: dict[str, Any], stack_range: tuple[int, int]
+) -> None:
+    """
+    Adds the ppi metric of a stack to `page_ppi`, with the page numbers of the stack
+    mapped back to the whole input
+    """
+    for page, ppi in metrics.get("ppi", {}).items():
+        page_ppi[stack_range[0] + page] = ppi
+
+
+def _render_stack(
+    pages: range, output: Path, options: dict[str, Any]
+) -> tuple[Path, dict[str, Any]]:
+    """
+    Renders a single stack of midpage_multi in a worker process, returns the stack file
+    and the metrics of the stack
+    """
+    press = Press(parallel.worker_renderer(), pages=pages)
+    progress = press.progress_midpage(output, **options)
+    progress.sync()
+    return output, progress.metrics
+
+
 class Press:
     """
     A Press object to process input files in several different ways
 
     ignore_errors: bool - ignore errors while reading the input files
-    pages: None -
+    pages: PageRanges, list[int | range] - only take these pages from the input
+    cache_bytes: int - keep upto this many bytes of rendered pages in memory, so that
+        rendering the same page at the same size again is free (default: None, no cache)
+    cache_dir: str, Path - keep rendered pages of the input files in this folder across runs
+        (default: None, no cache)
+    cache_dir_bytes: int - Maximum size of the cache folder (default: 1 GiB)
+    max_open_documents: int - keep at most this many input documents open at once, the
+        least recently used ones are closed and opened again when needed (default: None,
+        the pool shared by all presses which keeps 64 documents open)
+
+    The jobs of a press (the `progress_` functions, which run in their own thread) can
+    run at the same time, like `progress_midpage` and `progress_text` in parallel, as
+    the renderers guard their open documents
     """
 
     def __init__(
         self,
         files: list[str | Path] | Renderer,
         ignore_errors: bool = False,
-        pages: list[int | SupportsIndex] = None,
+        pages: PageSelection = None,
+        cache_bytes: int = None,
+        cache_dir: str | Path = None,
+        cache_dir_bytes: int = 2**30,
+        max_open_documents: int = None,
     ) -> None:
-        self.renderer = get_renderer(files, ignore_errors)
+        cache = DiskCache(cache_dir, cache_dir_bytes) if cache_dir else None
+        pool = DocumentPool(max_open_documents) if max_open_documents else None
+        self.renderer = get_renderer(files, ignore_errors, cache, pool)
+        if cache_bytes:
+            self.renderer = CachedRenderer(self.renderer, cache_bytes)
         if pages is not None:
-            self.renderer = PageRangeRenderer(self.renderer, *pages)
+            self.renderer = PageRangeRenderer(self.renderer, pages)
 
     def midpage_multi(self, output: str | Path | BinaryIO, **options) -> None:
         """
@@ -64,6 +146,20 @@ class Press:
 
         rtl: bool - Right to left
         flip_even: bool - Flip even pages horizontally by rotating them 180 degrees
+        workers: int - Number of processes to render with, the stacks are rendered
+            concurrently by the processes if there are multiple stacks. Scripts using
+            more than 1 have to run under `if __name__ == "__main__":` as the processes
+            import the main module again (default: 1)
+        vector: bool - Place pages of pdf like inputs as vector content instead of rendering
+            them, other inputs are still rendered (default: False)
+        colorspace: str - "rgb", "gray" or "mono" (black and white), the colorspace pages
+            are rendered in (default: "rgb")
+        encoding: str - "flate" (lossless), "jpeg" or "jpx" (jpeg 2000), the encoding of
+            rendered pages in the pdf, mono pages always use flate (default: "flate")
+        quality: int - Quality of jpeg and jpx encoded pages from 1 to 100 (default: 85)
+        max_upscale: float - Never render a page made of a single image (like a scan) larger
+            than this many times its own resolution, 1 renders such pages at most at their
+            own resolution (default: None, pages are rendered at the given resolution)
         separate_stacks: bool - Separates the stacks into multiple pdf files, (default False)
             if true, provide a folder to the output parameter instead.
         stack_prefix: str - Prefix for stack pdfs, (default "stack_")
@@ -83,12 +179,21 @@ class Press:
             "ppi": 200,
             "rtl": False,
             "flip_even": False,
+            "workers": 1,
+            "vector": False,
+            "colorspace": "rgb",
+            "encoding": "flate",
+            "quality": 85,
+            "max_upscale": None,
             "separate_stacks": False,
             "stack_prefix": "stack_",
             "stack_size": 40,
         }
 
         _set_defaults_and_check_unknown(options, defaults)
+        check_colorspace(options["colorspace"])
+        check_encoding(options["encoding"], options["quality"])
+        _check_max_upscale(options["max_upscale"])
 
         if options["separate_stacks"]:
             Path(output).mkdir(parents=True, exist_ok=True)
@@ -104,7 +209,6 @@ class Press:
 
         num_stacks = total_pages // stack_size
         extra_pages = total_pages % stack_size
-        total_naming_digits = len(str(num_stacks))
 
         cur_st = 0
         for _ in range(num_stacks):
@@ -116,59 +220,118 @@ class Press:
                 decided_stack_ranges.append((cur_st, cur_st + stack_size))
                 cur_st += stack_size
 
-        prev_progress = 0
-        output_streams = (
-            []
-        )  # Used to save pdf results in memory if the pdf needs to be mergeed at the end
+        # Pages that could not be distributed into the stacks make up a last stack
+        if cur_st < total_pages:
+            decided_stack_ranges.append((cur_st, total_pages))
+
+        total_naming_digits = len(str(len(decided_stack_ranges)))
 
         # Make sure the stack ranges don't exceed the amount of available pages
         decided_stack_ranges[-1] = decided_stack_ranges[-1][0], min(
             decided_stack_ranges[-1][1], total_pages
         )
 
-        for current_stack, current_stack_range in enumerate(decided_stack_ranges):
-            progress.set_msg(f"Rendering stack {current_stack+1}")
-            output_stream = io.BytesIO()
-            press = Press(self.renderer, pages=range(*current_stack_range))
-            progress_object = press.progress_midpage(
-                output_stream,
-                size=options["size"],
-                margin=options["margin"],
-                ppi=options["ppi"],
-                rtl=options["rtl"],
-                flip_even=options["flip_even"],
+        stack_options = {
+            "size": options["size"],
+            "margin": options["margin"],
+            "ppi": options["ppi"],
+            "rtl": options["rtl"],
+            "flip_even": options["flip_even"],
+            "vector": options["vector"],
+            "colorspace": options["colorspace"],
+            "encoding": options["encoding"],
+            "quality": options["quality"],
+            "max_upscale": options["max_upscale"],
+        }
+
+        def stack_path(folder: str | Path, stack: int) -> Path:
+            return Path(folder) / (
+                options["stack_prefix"]
+                + str(stack + 1).rjust(total_naming_digits, "0")
+                + ".pdf"
             )
 
-            while not progress_object.completed:
-                progress_object.check_fail()
-                progress.set_progress(prev_progress + progress_object.progress)
-
-            if options["separate_stacks"]:
-                output_stream.seek(0)
-                with open(
-                    Path(output)
-                    / (
-                        options["stack_prefix"]
-                        + str(current_stack + 1).rjust(total_naming_digits, "0")
-                        + ".pdf"
-                    ),
-                    "wb",
-                ) as fp:
-                    shutil.copyfileobj(output_stream, fp)
-                del output_stream  # To free up memory
-            else:
-                output_streams.append(output_stream)
+        # The ppi every page is rendered at, reported as the "ppi" metric
+        page_ppi = {}
 
-            prev_progress += progress_object.progress
+        # Stacks are appended to the output as soon as they are rendered, so that only
+        # one stack is held in memory at a time
+        writer = (
+            contextlib.nullcontext()
+            if options["separate_stacks"]
+            else PDFWriter(output)
+        )
 
-        if not options["separate_stacks"]:
-            progress.set_msg("Merging stacks into one document")
-            new_pdf = pymupdf.Document()
-            for i, x in enumerate(output_streams):
-                x.seek(0)
-                new_pdf.insert_pdf(pymupdf.Document(stream=x, filetype="pdf"))
-                del output_streams[i]
-            new_pdf.ez_save(output)
+        # Stacks are independent of each other, so with multiple workers each stack is
+        # rendered by a worker process on its own
+        if options["workers"] > 1 and len(decided_stack_ranges) > 1:
+            progress.set_msg(
+                f"Rendering {len(decided_stack_ranges)} stacks with {options['workers']} workers"
+            )
+            with writer, tempfile.TemporaryDirectory(prefix="homepress_") as tempdir:
+                pool = parallel.worker_pool(self.renderer, options["workers"])
+                try:
+                    futures = []
+                    for current_stack, current_stack_range in enumerate(
+                        decided_stack_ranges
+                    ):
+                        stack_pages = range(*current_stack_range)
+                        stack_file = stack_path(
+                            output if options["separate_stacks"] else tempdir,
+                            current_stack,
+                        )
+                        futures.append(
+                            pool.submit(
+                                _render_stack, stack_pages, stack_file, stack_options
+                            )
+                        )
+
+                    # Merge the stacks in order, as soon as they are available
+                    for future, current_stack_range in zip(
+                        futures, decided_stack_ranges
+                    ):
+                        stack_file, metrics = parallel.worker_result(future)
+                        _add_stack_ppi(page_ppi, metrics, current_stack_range)
+                        if not options["separate_stacks"]:
+                            with pymupdf.open(stack_file) as doc:
+                                writer.append(doc)
+                            stack_file.unlink()
+                        progress.increment_progress(len(range(*current_stack_range)))
+                finally:
+                    pool.shutdown(cancel_futures=True)
+
+                progress.set_msg("Saving output to PDF")
+            progress.set_metric("ppi", page_ppi)
+            return
+
+        with writer:
+            for current_stack, current_stack_range in enumerate(decided_stack_ranges):
+                progress.set_msg(f"Rendering stack {current_stack+1}")
+                if options["separate_stacks"]:
+                    output_stream = stack_path(output, current_stack)
+                else:
+                    output_stream = io.BytesIO()
+
+                # The stack reports its progress to this progress through a child
+                press = Press(self.renderer, pages=range(*current_stack_range))
+                stack_progress = press.progress_midpage(
+                    output_stream,
+                    progress=progress.create_child(),
+                    workers=options["workers"],
+                    **stack_options,
+                )
+                stack_progress.wait()
+                stack_progress.check_fail()
+                _add_stack_ppi(page_ppi, stack_progress.metrics, current_stack_range)
+
+                if not options["separate_stacks"]:
+                    progress.set_msg(f"Writing stack {current_stack+1}")
+                    with pymupdf.open(stream=output_stream, filetype="pdf") as doc:
+                        writer.append(doc)
+                    del output_stream  # To free up memory
+
+            progress.set_msg("Saving output to PDF")
+        progress.set_metric("ppi", page_ppi)
 
     def midpage(self, output: str | Path | BinaryIO, **options) -> None:
         """
@@ -181,6 +344,22 @@ class Press:
 
         rtl: bool - Right to left
         flip_even: bool - Flip even pages horizontally by rotating them 180 degrees
+        workers: int - Number of processes to render pages with. Scripts using more
+            than 1 have to run under `if __name__ == "__main__":` as the processes import
+            the main module again (default: 1)
+        vector: bool - Place pages of pdf like inputs as vector content instead of rendering
+            them, other inputs are still rendered (default: False)
+        colorspace: str - "rgb", "gray" or "mono" (black and white), the colorspace pages
+            are rendered in (default: "rgb")
+        encoding: str - "flate" (lossless), "jpeg" or "jpx" (jpeg 2000), the encoding of
+            rendered pages in the pdf, mono pages always use flate (default: "flate")
+        quality: int - Quality of jpeg and jpx encoded pages from 1 to 100 (default: 85)
+        max_upscale: float - Never render a page made of a single image (like a scan) larger
+            than this many times its own resolution, 1 renders such pages at most at their
+            own resolution (default: None, pages are rendered at the given resolution)
+        flush_every: int - Write the finished sheets to the output every this many sheets,
+            so that memory use doesn't grow with the length of the book (default: 0, the
+            whole output is held in memory and written at the end)
         """
         self.progress_midpage(output, **options).sync()
 
@@ -194,9 +373,23 @@ class Press:
             "ppi": 200,
             "rtl": False,
             "flip_even": False,
+            "workers": 1,
+            "vector": False,
+            "colorspace": "rgb",
+            "encoding": "flate",
+            "quality": 85,
+            "max_upscale": None,
+            "flush_every": 0,
         }
 
         _set_defaults_and_check_unknown(options, defaults)
+        check_colorspace(options["colorspace"])
+        check_encoding(options["encoding"], options["quality"])
+        _check_max_upscale(options["max_upscale"])
+        if options["flush_every"] < 0:
+            raise ValueError(
+                f"Sheets to flush every has to be positive: {options['flush_every']}"
+            )
 
         # Get binded page order
         page_order = _flatten(
@@ -241,76 +434,116 @@ class Press:
         )
 
         new_file = pymupdf.Document()
+        rotate = -90 if not options["rtl"] else 90
+
+        # Left positions of the top and bottom half pages on the rotated sheet
+        half_page_offsets = (margin[1], half_page_size[0] + margin[3])
+
+        # Pages that are placed as vector content instead of being rendered
+        vector_pages = set()
+        if options["vector"]:
+            vector_pages = {x for x in range(total_pages) if self.renderer.is_vector(x)}
+
+        render_order = [
+            x for x in _flatten(page_order) if x < total_pages and x not in vector_pages
+        ]
+
+        sizes = None
+        if options["max_upscale"] is not None:
+            progress.set_msg("Finding the native resolution of the pages")
+            sizes = _capped_sizes(
+                self.renderer,
+                render_order,
+                working_space_half_page_ppi_scaled,
+                options["max_upscale"],
+            )
+            progress.set_msg("Rendering input files to midpage binded PDF")
+
+        # Images are yielded in the same order as they are inserted in the loop below
+        images = render_encoded(
+            self.renderer,
+            render_order,
+            working_space_half_page_ppi_scaled,
+            options["workers"],
+            colorspace=options["colorspace"],
+            encoding=options["encoding"],
+            quality=options["quality"],
+            sizes=sizes,
+        )
 
-        for top_page, bottom_page in page_order:
-            page = new_file.new_page(width=p_size[0], height=p_size[1])
-
-            if top_page < total_pages:
-
-                top_page_pixmap = self.renderer.render(
-                    top_page, working_space_half_page_ppi_scaled
-                )
-
-                # I have no clue how I wrote this, but it works, so don't mess with this
-                size = (top_page_pixmap.w, top_page_pixmap.h)
-                clipped_size = pages.clip(size, working_space_half_page)
-                position_left = (
-                    margin[1] + (working_space_half_page[0] - clipped_size[0]) / 2
-                )
-                position_bottom = (
-                    margin[2] + (working_space_half_page[1] - clipped_size[1]) / 2
-                )
-                r = (position_bottom, position_left)
-                r += (
-                    clipped_size[1] + position_bottom,
-                    clipped_size[0] + position_left,
-                )
-
-                page.insert_image(
-                    r, pixmap=top_page_pixmap, rotate=-90 if not options["rtl"] else 90
-                )
-
-                progress.increment_progress()
-
-            if bottom_page < total_pages:
-                bottom_page_pixmap = self.renderer.render(
-                    bottom_page, working_space_half_page_ppi_scaled
-                )
+        # The ppi every rendered page ends up at, reported as the "ppi" metric
+        page_ppi = {}
+
+        # With `flush_every`, finished sheets are appended to the output in chunks and
+        # dropped from memory
+        flush_every = options["flush_every"]
+        writer = PDFWriter(output) if flush_every else contextlib.nullcontext()
+
+        # Identical images are stored once per document, the writer shares them
+        # between the flushed chunks
+        xrefs = {}
+
+        # The images are closed if the job fails, which shuts down the worker processes
+        # instead of keeping them until the traceback of the failure is dropped
+        with writer, contextlib.closing(images):
+            for sheet_no, sheet in enumerate(page_order):
+                page = new_file.new_page(width=p_size[0], height=p_size[1])
+
+                for page_no, offset in zip(sheet, half_page_offsets):
+                    if page_no >= total_pages:
+                        continue
+
+                    if page_no in vector_pages:
+                        # The page is fitted and centered within the working space
+                        box = pymupdf.Rect(
+                            margin[2],
+                            offset,
+                            margin[2] + working_space_half_page[1],
+                            offset + working_space_half_page[0],
+                        )
+                        self.renderer.show_page(page_no, page, box, rotate)
+                        progress.increment_progress()
+                        continue
+
+                    image = next(images)
+
+                    # I have no clue how I wrote this, but it works, so don't mess with this
+                    size = image.size
+                    clipped_size = pages.clip(size, working_space_half_page)
+                    position_left = (
+                        offset + (working_space_half_page[0] - clipped_size[0]) / 2
+                    )
+                    position_bottom = (
+                        margin[2] + (working_space_half_page[1] - clipped_size[1]) / 2
+                    )
+                    r = (position_bottom, position_left)
+                    r += (
+                        clipped_size[1] + position_bottom,
+                        clipped_size[0] + position_left,
+                    )
+
+                    insert_encoded(page, r, image, rotate, xrefs)
+                    page_ppi[page_no] = image.size[0] / clipped_size[0] * 72
 
-                # I have no clue how I wrote this, but it works, so don't mess with this
-                size = (bottom_page_pixmap.w, bottom_page_pixmap.h)
-                clipped_size = pages.clip(size, working_space_half_page)
-                position_left = (
-                    half_page_size[0]
-                    + margin[3]
-                    + (working_space_half_page[0] - clipped_size[0]) / 2
-                )
-                position_bottom = (
-                    margin[2] + (working_space_half_page[1] - clipped_size[1]) / 2
-                )
-                r = (position_bottom, position_left)
-                r += (
-                    clipped_size[1] + position_bottom,
-                    clipped_size[0] + position_left,
-                )
+                    progress.increment_progress()
 
-                page.insert_image(
-                    r,
-                    pixmap=bottom_page_pixmap,
-                    rotate=-90 if not options["rtl"] else 90,
-                )
+                # Flip after placing the pages, placement doesn't account for rotation
+                if options["flip_even"] and sheet_no % 2 == 1:
+                    page.set_rotation(180)
+                    progress.increment_progress()
 
-                progress.increment_progress()
+                if flush_every and new_file.page_count >= flush_every:
+                    writer.append(new_file)
+                    new_file = pymupdf.Document()
+                    xrefs.clear()
 
-        if options["flip_even"]:
-            progress.set_msg("Flipping even pages")
-            for i, x in enumerate(new_file):
-                if i % 2 == 1:
-                    x.set_rotation(180)
-                    progress.increment_progress()
+            progress.set_msg("Saving output to PDF")
+            if not flush_every:
+                new_file.ez_save(output)
+            elif new_file.page_count > 0:
+                writer.append(new_file)
 
-        progress.set_msg("Saving output to PDF")
-        new_file.ez_save(output)
+        progress.set_metric("ppi", page_ppi)
 
     def merge(self, output: str | Path | BinaryIO, **options) -> None:
         """
@@ -318,6 +551,19 @@ class Press:
 
         options:
         resolution: (w, h) - Max resolution in either dimensions, default: (1600, 1600)
+        workers: int - Number of processes to render pages with. Scripts using more
+            than 1 have to run under `if __name__ == "__main__":` as the processes import
+            the main module again (default: 1)
+        vector: bool - Copy pages of pdf like inputs as is instead of rendering them, other
+            inputs are still rendered (default: False)
+        colorspace: str - "rgb", "gray" or "mono" (black and white), the colorspace pages
+            are rendered in (default: "rgb")
+        encoding: str - "flate" (lossless), "jpeg" or "jpx" (jpeg 2000), the encoding of
+            rendered pages in the pdf, mono pages always use flate (default: "flate")
+        quality: int - Quality of jpeg and jpx encoded pages from 1 to 100 (default: 85)
+        max_upscale: float - Never render a page made of a single image (like a scan) larger
+            than this many times its own resolution, 1 renders such pages at most at their
+            own resolution (default: None, pages are rendered at the given resolution)
         """
         self.progress_merge(output, **options).sync()
 
@@ -325,24 +571,89 @@ class Press:
     def progress_merge(
         self, output: str | Path | BinaryIO, *, progress: Progress = None, **options
     ) -> Progress:
-        defaults = {"resolution": (1600, 1600)}
+        defaults = {
+            "resolution": (1600, 1600),
+            "workers": 1,
+            "vector": False,
+            "colorspace": "rgb",
+            "encoding": "flate",
+            "quality": 85,
+            "max_upscale": None,
+        }
         _set_defaults_and_check_unknown(options, defaults)
+        check_colorspace(options["colorspace"])
+        check_encoding(options["encoding"], options["quality"])
+        _check_max_upscale(options["max_upscale"])
 
         resolution = options["resolution"]
+        total_pages = len(self.renderer)
 
         new_file = pymupdf.Document()
-        progress.set_total(len(self.renderer))
+        progress.set_total(total_pages)
         progress.set_msg("Rendering and Merging input files to PDF")
 
-        for x in range(len(self.renderer)):
-            pixmap = self.renderer.render(page=x, size=resolution)
+        # Pages that are copied as is instead of being rendered
+        vector_pages = set()
+        if options["vector"]:
+            vector_pages = {x for x in range(total_pages) if self.renderer.is_vector(x)}
 
-            page = new_file.new_page(width=pixmap.width, height=pixmap.height)
-            page.insert_image((0, 0, pixmap.width, pixmap.height), pixmap=pixmap)
-            progress.increment_progress()
+        render_order = [x for x in range(total_pages) if x not in vector_pages]
+
+        sizes = None
+        if options["max_upscale"] is not None:
+            sizes = _capped_sizes(
+                self.renderer, render_order, resolution, options["max_upscale"]
+            )
+
+        images = render_encoded(
+            self.renderer,
+            render_order,
+            resolution,
+            options["workers"],
+            colorspace=options["colorspace"],
+            encoding=options["encoding"],
+            quality=options["quality"],
+            sizes=sizes,
+        )
+
+        # Identical images are stored once
+        xrefs = {}
+
+        # The size every rendered page ends up at, reported as the "resolution" metric
+        page_resolution = {}
+
+        # Closes the images (and the worker processes) if the job fails
+        with contextlib.closing(images):
+            # Runs of copied pages are copied as a batch, which releases the input
+            # documents once their pages are copied
+            for vector, run in itertools.groupby(
+                range(total_pages), lambda x: x in vector_pages
+            ):
+                if vector:
+                    run = list(run)
+                    self.renderer.copy_pages(run, new_file)
+                    progress.increment_progress(len(run))
+                    continue
+
+                for x in run:
+                    image = next(images)
+                    width, height = image.size
+                    page = new_file.new_page(width=width, height=height)
+                    insert_encoded(
+                        page, pymupdf.Rect(0, 0, width, height), image, 0, xrefs
+                    )
+                    page_resolution[x] = image.size
+                    progress.increment_progress()
+
+        progress.set_metric("resolution", page_resolution)
 
         progress.set_msg("Saving output")
-        new_file.ez_save(output)
+        if vector_pages:
+            # Merging duplicate objects gets very slow with lots of copied pages, so only
+            # unused objects are removed
+            new_file.ez_save(output, garbage=1)
+        else:
+            new_file.ez_save(output)
 
     def images(self, output: str | Path, **options) -> None:
         """
@@ -352,6 +663,11 @@ class Press:
         file_prefix: str - Defaults to nothing
         resolution: (w, h) - Max resolution in either dimension
         format: str - "png", "jpg", other formats are saved using pil (default: png)
+        workers: int - Number of processes to render pages with. Scripts using more
+            than 1 have to run under `if __name__ == "__main__":` as the processes import
+            the main module again (default: 1)
+        colorspace: str - "rgb", "gray" or "mono" (black and white), mono images are
+            saved with 1 bit per pixel (default: "rgb")
         pil_*: options to pass to PIL saver
         """
         self.progress_images(output, **options).sync()
@@ -367,8 +683,11 @@ class Press:
             "file_prefix": "",
             "resolution": (1600, 1600),
             "format": "png",
+            "workers": 1,
+            "colorspace": "rgb",
         }
         _set_defaults_and_check_unknown(options, defaults, ignore_prefix=("pil_",))
+        check_colorspace(options["colorspace"])
 
         format = options["format"]
         file_prefix = options["file_prefix"]
@@ -385,16 +704,29 @@ class Press:
         progress.set_total(len(self.renderer))
         progress.set_msg("Rendering input files to images")
 
-        for x in range(len(self.renderer)):
-            pixmap = self.renderer.render(page=x, size=resolution)
-            if format in ("png",):
-                pixmap.save(path / f"{file_prefix}{x+1}.{format}", format)
-            else:
-                pixmap.pil_save(
-                    path / f"{file_prefix}{x+1}.{format}", format, **pil_params
-                )
+        pixmaps = render_pages(
+            self.renderer,
+            range(len(self.renderer)),
+            resolution,
+            options["workers"],
+            colorspace=options["colorspace"],
+        )
+        # Closes the pixmaps (and the worker processes) if the job fails
+        with contextlib.closing(pixmaps):
+            for x, pixmap in enumerate(pixmaps):
+                if options["colorspace"] == "mono":
+                    # Pymupdf can't save pixmaps with 1 bit per pixel
+                    bilevel_image(pixmap).save(
+                        path / f"{file_prefix}{x+1}.{format}", format, **pil_params
+                    )
+                elif format in ("png",):
+                    pixmap.save(path / f"{file_prefix}{x+1}.{format}", format)
+                else:
+                    pixmap.pil_save(
+                        path / f"{file_prefix}{x+1}.{format}", format, **pil_params
+                    )
 
-            progress.increment_progress()
+                progress.increment_progress()
 
     def text(self) -> list[str]:
         """
@@ -12,14 +12,20 @@ class Progress:
         total: int = 1 - The total parts of the progress based process
         progress: int = 0 - Initial progress
         msg: str = Initial message to show/display/save for the progress
-        callback: callable = A callback to run in a separate thread everytime progress is set or changed
+        callback: callable = A callback to run everytime progress is set or changed
+        callback_threading: bool = Run the callback from a dispatcher thread instead of the
+            thread changing the progress, changes made while the callback runs are coalesced
+            into a single call
+        callback_interval: float = Minimum time between two callback calls in seconds,
+            changes within the interval are coalesced, the final update is always delivered
+        parent: Progress = A parent progress to forward all the progress changes to
 
     If you are provided a progress object, ur general flow would be as follows
 
     ```python3
     progress = progressed_function(...)
 
-    while not progress.completed:
+    while not progress.wait(0.1):  # Blocks until completion or for 0.1 seconds
         progress.check_fail()  # Check for errors
         print("Progress:", progress.percent, "%", progress.msg)
     ```
@@ -29,6 +35,17 @@ class Progress:
     ```python3
     progress.sync()
     ```
+
+    A nested job may report to a child progress, every change to the progress of the
+    child is also applied to its parent
+
+    ```python3
+    child = progress.create_child()
+    progressed_function(..., progress=child).wait()
+    ```
+
+    Functions may report metrics about their work in `Progress.metrics`, a dictionary of
+    metric names to values that is complete once the progress is
     """
 
     def __init__(
@@ -38,6 +55,8 @@ class Progress:
         msg: str = "",
         callback: callable = None,
         callback_threading: bool = False,
+        callback_interval: float = 0,
+        parent: "Progress" = None,
     ) -> None:
         self.total = total
         self.progress = progress
@@ -46,10 +65,24 @@ class Progress:
         self.failed = False
         self.callback = callback
         self.callback_threading = callback_threading
+        self.callback_interval = callback_interval
+        self.parent = parent
         self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self._done = False
+        self._callback_pending = False
+        self._callback_last = 0
+        self._dispatcher: threading.Thread = None
         self.result = None
+        self.metrics: dict[str, Any] = {}
         self.thread: threading.Thread = None
 
+    def create_child(self, total: int = 1, msg: str = "") -> "Progress":
+        """
+        Create a child progress, whose progress changes are forwarded to this progress
+        """
+        return Progress(total, msg=msg, parent=self)
+
     def increment_progress(self, by: int = 1) -> None:
         """
         Function Method
@@ -58,16 +91,56 @@ class Progress:
         """
         with self._lock:
             self.progress += by
-            self._call_callback()
+        self._call_callback()
 
-    def _call_callback(self) -> None:
+        if self.parent is not None:
+            self.parent.increment_progress(by)
+
+    def _call_callback(self, final: bool = False) -> None:
+        """
+        Must be called without holding the lock
+        """
         if self.callback is None:
             return
+
         if self.callback_threading:
-            threading.Thread(self.callback, args=(self,), daemon=True).start()
-        else:
+            with self._lock:
+                self._callback_pending = True
+                if self._dispatcher is None:
+                    self._dispatcher = threading.Thread(
+                        target=self._dispatch_callbacks, daemon=True
+                    )
+                    self._dispatcher.start()
+                self._condition.notify_all()
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            if not final and now - self._callback_last < self.callback_interval:
+                return
+            self._callback_last = now
+        self.callback(self)
+
+    def _dispatch_callbacks(self) -> None:
+        """
+        Runs the callback from a single thread, any number of changes made while the
+        callback is running or waiting for the interval result in a single call
+        """
+        while True:
+            with self._lock:
+                self._condition.wait_for(lambda: self._callback_pending or self._done)
+                if not self._callback_pending:
+                    # A later change starts a new dispatcher
+                    self._dispatcher = None
+                    return
+                self._callback_pending = False
+
             self.callback(self)
 
+            # Wait for the interval, unless the progress is done
+            with self._lock:
+                self._condition.wait_for(lambda: self._done, self.callback_interval)
+
     def set_progress(self, progress: int) -> None:
         """
         Function Method
@@ -75,8 +148,12 @@ class Progress:
         Sets the progress to given `progress`
         """
         with self._lock:
+            by = progress - self.progress
             self.progress = progress
-            self._call_callback()
+        self._call_callback()
+
+        if self.parent is not None:
+            self.parent.increment_progress(by)
 
     def set_total(self, total: int) -> None:
         """
@@ -96,6 +173,15 @@ class Progress:
         with self._lock:
             self.msg = msg
 
+    def set_metric(self, name: str, value: Any) -> None:
+        """
+        Function Method
+
+        Sets the metric `name` of Progress.metrics to `value`
+        """
+        with self._lock:
+            self.metrics[name] = value
+
     def fail(self, e: Exception) -> None:
         """
         Function Method (Not to be used, errors raised are automatically handled by decorator)
@@ -105,6 +191,9 @@ class Progress:
             self.msg = str(e)
             self.exception = e
             self.failed = True
+            self._done = True
+            self._condition.notify_all()
+        self._call_callback(final=True)
 
     def complete(self, result: Any = None) -> None:
         """
@@ -112,7 +201,14 @@ class Progress:
         """
         with self._lock:
             self.result = result
+            by = self.total - self.progress
             self.progress = self.total
+            self._done = True
+            self._condition.notify_all()
+        self._call_callback(final=True)
+
+        if self.parent is not None:
+            self.parent.increment_progress(by)
 
     def check_fail(self) -> None:
         """
@@ -122,11 +218,20 @@ class Progress:
         if self.failed:
             raise self.exception
 
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Block until the underlying function has finished (or failed) or until the timeout
+        (in seconds) occurs. Returns True if it has finished.
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self._done, timeout)
+
     def sync(self) -> Any:
         """
         Synchronise the underlying function to the main thread. Blocks until the underlying
         function has finished completion
         """
+        self.wait()
         self.thread.join()
         self.check_fail()
         return self.result
@@ -148,7 +253,7 @@ class Progress:
             print("\r" + t.ljust(previous_msg_len), end="", flush=True)
             previous_msg_len = len(t)
 
-            time.sleep(poll_delay)
+            self.wait(poll_delay)
         print()
         return self.sync()
 
@@ -157,7 +262,7 @@ class Progress:
         """
         Check if the progress has completed or if its still alive
         """
-        return not self.thread.is_alive()
+        return self._done
 
     @property
     def percent(self) -> float:
@@ -172,6 +277,9 @@ def runs_with_progress(func: callable) -> callable:
     A decorator to convert a function to run with progress
     The function should take a "progress" keyword argument of type `Progress`
 
+    An existing progress (e.g. a child progress) may be passed as the "progress" keyword
+    argument, otherwise a new one is created.
+
     The function then may proceed to set the total by `progress.set_total(<total amount to do>)`
     The function may increment progress by `progress.increment_progress([<by: int = 1>])`
     The function may set an optional display message with `progress.set_msg(<msg: str>)`
@@ -196,7 +304,7 @@ def runs_with_progress(func: callable) -> callable:
     """
 
     def progressed_function(*args, **kwargs):
-        progress = Progress()
+        progress = kwargs.get("progress") or Progress()
 
         def progress_failure_catch_func(*args, **kwargs):
             progress = kwargs["progress"]
@@ -1,14 +1,30 @@
 import logging
-from functools import cmp_to_key
+import os
+import re
 from pathlib import Path
 
+from .cached_renderer import CachedRenderer
+from .colorspace import COLORSPACES, Colorspace
+from .disk_cache import DiskCache
+from .document_pool import DocumentPool
 from .multi_renderer import MultiRenderer
 from .mupdf_renderer import MuPDFRenderer
-from .page_range_renderer import PageRangeRenderer
+from .page_range_renderer import PageRangeRenderer, PageRanges
 from .pil_renderer import PILRenderer
 from .renderer_abc import Renderer
 
-__all__ = ["get_renderer", "MultiRenderer", "PageRangeRenderer", "Renderer"]
+__all__ = [
+    "get_renderer",
+    "COLORSPACES",
+    "Colorspace",
+    "CachedRenderer",
+    "DiskCache",
+    "DocumentPool",
+    "MultiRenderer",
+    "PageRangeRenderer",
+    "PageRanges",
+    "Renderer",
+]
 
 # All the supported real renderers
 renderers: list[Renderer] = [MuPDFRenderer, PILRenderer]
@@ -19,104 +35,117 @@ for x in renderers:
     formats.update(x.supported_extensions)
 
 
-def _split_into_parts(k: str):
+_digits = re.compile(r"(\d+)")
+
+
+def _split_into_parts(k: str) -> list[str | int]:
     """
-    Splits the input string into multiple parts
+    Splits the input string into alternating text and number parts, starting and ending
+    with text (which may be empty)
     "a124eajnf.12.@32" would turn to
-        ['a', '123', 'eajnf', '.', '12', '.@', '32']
+        ['a', 124, 'eajnf.', 12, '.@', 32, '']
 
 
     Args:
         k (str): The string to split
 
     Returns:
-        list[str]: The returned list
+        list[str | int]: The returned list
     """
-    d = []
-    buff = ""
-    mode = "s"
-    for x in k:
-        if x.isdigit():
-            if mode == "i":
-                buff += x
-            else:
-                mode = "i"
-                d.append(buff)
-                buff = x
-        else:
-            if mode == "s":
-                buff += x
-            else:
-                mode = "s"
-                d.append(int(buff))
-                buff = x
-
-    if buff:
-        if mode == "i":
-            d.append(int(buff))
-        else:
-            d.append(buff)
-
-    return d
+    parts = _digits.split(k)
+    parts[1::2] = map(int, parts[1::2])
+    return parts
 
 
-# TODO: Implement this
-def _name_num_sort_cmp(a: str, b: str):
-    a_parts = _split_into_parts(a)
-    b_parts = _split_into_parts(b)
-
-    for x, y in zip(a_parts, b_parts):
-        if x > y:
-            return 1
-        elif x < y:
-            return -1
+def _name_num_sort_key(name: str) -> list[str | int]:
+    """
+    Sort key that orders names naturally, numbers within names are compared by their
+    value so "2.png" comes before "10.png". Names split into alternating text and number
+    parts, so the parts at the same position are always comparable
+    """
+    return _split_into_parts(name)
 
-    if len(a_parts) > len(b_parts):
-        return 1
-    elif len(b_parts) > len(a_parts):
-        return -1
-    return 0
 
+# The renderer of every supported extension
+_extension_renderers: dict[str, type[Renderer]] = {}
+for x in reversed(renderers):  # Earlier renderers take precedence
+    _extension_renderers.update(dict.fromkeys(x.supported_extensions, x))
 
-_name_num_sort_key = cmp_to_key(_name_num_sort_cmp)
 
+def _scan_directory(path: str | Path) -> list[str]:
+    """
+    All the files within the directory and its subdirectories, in natural order of their
+    names with the files of a subdirectory in place of the subdirectory. Only the
+    directory entries are read
+    """
+    with os.scandir(path) as it:
+        entries = sorted(it, key=lambda x: _name_num_sort_key(x.name))
 
-def get_renderer(files: list | Renderer, ignore_errors: bool = False) -> Renderer:
+    files = []
+    for x in entries:
+        if x.is_dir():
+            files.extend(_scan_directory(x.path))
+        else:
+            files.append(x.path)
+    return files
+
+
+def _file_renderer(
+    path: str | Path, cache: DiskCache = None, pool: DocumentPool = None
+) -> Renderer:
+    ext = os.path.splitext(path)[1][1:]
+    if (renderer := _extension_renderers.get(ext)) is not None:
+        return renderer(path, cache=cache, pool=pool)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"File not found: {path}")
+    raise TypeError(f"File format not supported for {path}")
+
+
+def get_renderer(
+    files: list | Renderer,
+    ignore_errors: bool = False,
+    cache: DiskCache = None,
+    pool: DocumentPool = None,
+) -> Renderer:
     """
     Given a set of files (May contain recursivly traversed folders), return a renderer that
-    aggregates all the given files into a single renderer instance.
-    """
-    global renderers
+    aggregates all the given files into a single renderer instance. The renderers of the
+    files use `cache` to store and reuse their renders if given, and lease their open
+    documents from `pool` (a pool shared by all renderers by default).
 
+    Folders are scanned without opening the files, and the files are only opened once
+    their pages are needed.
+    """
     if isinstance(files, Renderer):
         return files
 
-    if len(files) == 1:
+    if len(files) == 1 and not Path(files[0]).is_dir():
         path = Path(files[0])
-        if path.is_dir():
-            return get_renderer(
-                sorted(list(path.iterdir()), key=lambda x: _name_num_sort_key(x.name)),
-                ignore_errors,
-            )
-        elif path.is_file():
-            ext = path.suffix.strip(".")
-            if ext in formats:
-                for x in renderers:
-                    if ext in x.supported_extensions:
-                        return x(files[0])
+        if path.is_file():
+            return _file_renderer(path, cache, pool)
         elif not path.exists():
             raise FileNotFoundError(f"File not found: {path}")
         raise TypeError(f"File format not supported for {path}")
 
-    else:
-        render = []
-        for x in files:
-            try:
-                render.append(get_renderer([x], ignore_errors=ignore_errors))
-            except TypeError as e:
-                if ignore_errors:
-                    logging.warning(f"ignored: {e}")
-                else:
-                    raise e
-
-        return MultiRenderer(render)
+    paths = []
+    for x in files:
+        if Path(x).is_dir():
+            paths.extend(_scan_directory(x))
+        else:
+            paths.append(x)
+
+    # Files of a single folder aren't wrapped, like a single file
+    if len(files) == 1 and len(paths) == 1:
+        return _file_renderer(paths[0], cache, pool)
+
+    render = []
+    for x in paths:
+        try:
+            render.append(_file_renderer(x, cache, pool))
+        except TypeError as e:
+            if ignore_errors:
+                logging.warning(f"ignored: {e}")
+            else:
+                raise e
+
+    return MultiRenderer(render)
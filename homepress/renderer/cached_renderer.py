@@ -0,0 +1,130 @@
+import threading
+from collections import OrderedDict
+from typing import Hashable, Iterable, Iterator
+
+from pymupdf import Document, Page, Pixmap, Rect
+
+from .colorspace import Colorspace
+from .renderer_abc import EncodedImage, Renderer, Size
+
+
+class CachedRenderer(Renderer):
+    """
+    A renderer that keeps the pixmaps rendered by a child renderer in memory, keyed by
+    page and size. At most `max_bytes` of pixel data is kept, the least recently used
+    pixmaps are evicted first.
+
+    The cached pixmaps are shared between callers and must not be modified. The cache
+    is not carried over when the renderer is copied to worker processes.
+    """
+
+    def __init__(self, renderer: Renderer, max_bytes: int) -> None:
+        self.renderer = renderer
+        self.max_bytes = max_bytes
+        self._init_cache()
+
+    def _init_cache(self) -> None:
+        self.cached_bytes = 0
+        self._cache: OrderedDict[Hashable, Pixmap] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        return {"renderer": self.renderer, "max_bytes": self.max_bytes}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._init_cache()
+
+    def __len__(self) -> int:
+        return len(self.renderer)
+
+    def _get(self, key: Hashable) -> Pixmap | None:
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        return None
+
+    def _cached(self, key: Hashable, render: callable) -> Pixmap:
+        if (pixmap := self._get(key)) is not None:
+            return pixmap
+
+        pixmap = render()
+        self._put(key, pixmap)
+        return pixmap
+
+    def _put(self, key: Hashable, pixmap: Pixmap) -> None:
+        nbytes = pixmap.stride * pixmap.height
+        with self._lock:
+            if nbytes <= self.max_bytes and key not in self._cache:
+                self._cache[key] = pixmap
+                self.cached_bytes += nbytes
+                while self.cached_bytes > self.max_bytes:
+                    _, evicted = self._cache.popitem(last=False)
+                    self.cached_bytes -= evicted.stride * evicted.height
+
+    def clear(self) -> None:
+        """
+        Removes all the cached pixmaps
+        """
+        with self._lock:
+            self._cache.clear()
+            self.cached_bytes = 0
+
+    def render(self, page: int, size: Size, colorspace: Colorspace = "rgb") -> Pixmap:
+        return self._cached(
+            (page, tuple(size), colorspace),
+            lambda: self.renderer.render(page, size, colorspace),
+        )
+
+    def render_many(
+        self, pages: Iterable[int], size: Size, colorspace: Colorspace = "rgb"
+    ) -> Iterator[Pixmap]:
+        size = tuple(size)
+        pages = list(pages)
+
+        # Hold on to the cached pixmaps so that they can't be evicted while the missing
+        # pages are being rendered, the missing pages are rendered as a single batch
+        cached = {
+            x: pixmap
+            for x in pages
+            if (pixmap := self._get((x, size, colorspace))) is not None
+        }
+        rendered = self.renderer.render_many(
+            [x for x in pages if x not in cached], size, colorspace
+        )
+
+        for x in pages:
+            if x in cached:
+                yield cached[x]
+            else:
+                pixmap = next(rendered)
+                self._put((x, size, colorspace), pixmap)
+                yield pixmap
+
+    def extract_image(
+        self, page: int, size: Size, colorspace: Colorspace = "rgb"
+    ) -> EncodedImage | None:
+        # Extracting is cheap, the encoded images aren't cached
+        return self.renderer.extract_image(page, size, colorspace)
+
+    def render_preview(self, page: int) -> Pixmap:
+        return self._cached((page, None), lambda: self.renderer.render_preview(page))
+
+    def get_text(self, page: int) -> str:
+        return self.renderer.get_text(page)
+
+    def native_size(self, page: int) -> Size | None:
+        return self.renderer.native_size(page)
+
+    def is_vector(self, page: int) -> bool:
+        return self.renderer.is_vector(page)
+
+    def show_page(self, page: int, target: Page, rect: Rect, rotate: int = 0) -> None:
+        self.renderer.show_page(page, target, rect, rotate)
+
+    def copy_page(self, page: int, target: Document) -> None:
+        self.renderer.copy_page(page, target)
+
+    def copy_pages(self, pages: Iterable[int], target: Document) -> None:
+        self.renderer.copy_pages(pages, target)
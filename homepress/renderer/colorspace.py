@@ -0,0 +1,56 @@
+"""
+The colorspaces pages can be rendered in, and conversions between them
+"""
+
+from typing import Literal
+
+import PIL.Image
+import pymupdf
+
+type Colorspace = Literal["rgb", "gray", "mono"]
+
+COLORSPACES: tuple[Colorspace, ...] = ("rgb", "gray", "mono")
+
+# Maps gray levels to black or white
+_threshold_table = bytes(0 if x < 128 else 255 for x in range(256))
+
+
+def check_colorspace(colorspace: str) -> None:
+    if colorspace not in COLORSPACES:
+        raise ValueError(
+            f"Unknown colorspace {colorspace!r}, valid values are {', '.join(COLORSPACES)}"
+        )
+
+
+def threshold(pixmap: pymupdf.Pixmap) -> pymupdf.Pixmap:
+    """
+    Converts a grayscale pixmap without alpha to pure black and white
+    """
+    return pymupdf.Pixmap(
+        pymupdf.csGRAY,
+        pixmap.width,
+        pixmap.height,
+        pixmap.samples.translate(_threshold_table),
+        False,
+    )
+
+
+def convert_pixmap(pixmap: pymupdf.Pixmap, colorspace: Colorspace) -> pymupdf.Pixmap:
+    """
+    Converts a pixmap without alpha to the given colorspace. Pixmaps in the mono
+    colorspace are grayscale pixmaps that only contain black and white.
+    """
+    if colorspace == "rgb":
+        return pixmap if pixmap.n == 3 else pymupdf.Pixmap(pymupdf.csRGB, pixmap)
+
+    if pixmap.n != 1:
+        pixmap = pymupdf.Pixmap(pymupdf.csGRAY, pixmap)
+    return threshold(pixmap) if colorspace == "mono" else pixmap
+
+
+def bilevel_image(pixmap: pymupdf.Pixmap) -> PIL.Image.Image:
+    """
+    Converts a pixmap in the mono colorspace to a 1 bit per pixel image
+    """
+    im = PIL.Image.frombytes("L", (pixmap.width, pixmap.height), pixmap.samples)
+    return im.convert("1", dither=PIL.Image.Dither.NONE)
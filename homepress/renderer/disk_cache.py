@@ -0,0 +1,115 @@
+import hashlib
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from pymupdf import Pixmap
+
+
+class DiskCache:
+    """
+    A persistent cache of rendered pages, stored as png files within `directory`.
+
+    Entries are keyed by the input file (its path, size and modification time, so that
+    a changed file is never served from the cache) and any other render parameters. The
+    cache is limited to `max_bytes`, the least recently used entries are removed first.
+    The same directory may be shared by several processes.
+    """
+
+    def __init__(self, directory: str | Path, max_bytes: int = 2**30) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._used_bytes = None  # Counted on first write
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        return {"directory": self.directory, "max_bytes": self.max_bytes}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._used_bytes = None
+        self._lock = threading.Lock()
+
+    def key(self, file: str | Path, *parts) -> str:
+        """
+        Get the cache key for a render of `file` with the given render parameters
+        """
+        stat = os.stat(file)
+        ident = (str(Path(file).resolve()), stat.st_size, stat.st_mtime_ns, *parts)
+        return hashlib.sha1(repr(ident).encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.png"
+
+    def get(self, key: str) -> Pixmap | None:
+        """
+        Get the cached pixmap for `key` or None if it isn't cached
+        """
+        path = self._path(key)
+        try:
+            pixmap = Pixmap(str(path))
+            os.utime(path)  # Mark as recently used
+        except Exception:  # Missing, being evicted by another process or corrupt
+            return None
+        return pixmap
+
+    def put(self, key: str, pixmap: Pixmap) -> None:
+        """
+        Store `pixmap` in the cache as `key`
+        """
+        data = pixmap.tobytes("png")
+        if len(data) > self.max_bytes:
+            return
+
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+
+        # Write to a temporary file first, so that other processes never see a partial file
+        fd, temp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                fp.write(data)
+            os.replace(temp, path)
+        except BaseException:
+            os.unlink(temp)
+            raise
+
+        with self._lock:
+            if self._used_bytes is None:
+                self._used_bytes = sum(x.stat().st_size for x in self._entries())
+            else:
+                self._used_bytes += len(data)
+
+            if self._used_bytes > self.max_bytes:
+                self._evict()
+
+    def _entries(self) -> list[os.DirEntry]:
+        entries = []
+        for x in os.scandir(self.directory):
+            if x.is_dir():
+                entries.extend(y for y in os.scandir(x) if y.name.endswith(".png"))
+        return entries
+
+    def _evict(self) -> None:
+        """
+        Removes the least recently used entries until the cache is at 90% of its size
+        """
+        entries = []
+        for x in self._entries():
+            try:
+                entries.append((x.stat().st_mtime_ns, x.stat().st_size, x.path))
+            except FileNotFoundError:  # Removed by another process
+                pass
+        entries.sort()
+
+        self._used_bytes = sum(x[1] for x in entries)
+        for _, size, path in entries:
+            if self._used_bytes <= self.max_bytes * 0.9:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            self._used_bytes -= size
@@ -0,0 +1,143 @@
+import contextlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Iterator
+
+import pymupdf
+
+
+class DocumentPool:
+    """
+    A pool of open documents shared by renderers, so that rendering thousands of files
+    only keeps `max_open` documents (and their file handles, xref tables and font caches)
+    open. The least recently used documents are closed first and opened again when they
+    are needed. Documents that are leased are never closed, so the pool may temporarily
+    hold more documents while many are in use.
+
+    The pool is thread-safe, and a leased document is only used by the thread that
+    leased it until the lease is returned, see `lease`.
+
+    ```python
+    with pool.lease(key, lambda: pymupdf.open(file)) as doc:
+        doc[0].get_pixmap()
+    ```
+
+    A pickled pool is unpickled without its documents.
+    """
+
+    def __init__(self, max_open: int = 64) -> None:
+        if max_open < 1:
+            raise ValueError(f"At least one document has to be kept open: {max_open}")
+
+        self.max_open = max_open
+        self._documents: OrderedDict[Hashable, pymupdf.Document] = OrderedDict()
+        self._leases: dict[Hashable, int] = {}  # Number of leases of every document
+        # MuPDF documents can't be used by several threads at once, a lease holds the
+        # lock of its document
+        self._locks: dict[Hashable, threading.RLock] = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        return {"max_open": self.max_open}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(state["max_open"])
+
+    def __len__(self) -> int:
+        """
+        Number of open documents
+        """
+        return len(self._documents)
+
+    @contextlib.contextmanager
+    def lease(
+        self, key: Hashable, opener: Callable[[], pymupdf.Document]
+    ) -> Iterator[pymupdf.Document]:
+        """
+        Lease the document `key`, which is opened with `opener` if it isn't open. The
+        document stays open until the lease is returned.
+
+        A lease is exclusive: leasing a document that another thread holds blocks until
+        that lease is returned, the same thread may lease a document again. Leases must
+        be returned by the thread that took them, so they shouldn't be held across the
+        `yield` of a generator
+        """
+        with self._lock:
+            self._leases[key] = self._leases.get(key, 0) + 1
+            lock = self._locks.setdefault(key, threading.RLock())
+
+        try:
+            with lock:
+                with self._lock:
+                    doc = self._documents.get(key)
+                    if doc is not None:
+                        self._documents.move_to_end(key)
+
+                if doc is None:
+                    # Opening may take long (converting a document to pdf), so only the
+                    # lock of the document is held
+                    doc = opener()
+                    with self._lock:
+                        self._documents[key] = doc
+
+                yield doc
+        finally:
+            with self._lock:
+                self._leases[key] -= 1
+                if self._leases[key] == 0:
+                    del self._leases[key]
+                    if key not in self._documents:  # The opener failed
+                        del self._locks[key]
+                closing = self._evict()
+
+            for x in closing:
+                x.close()
+
+    def _evict(self) -> list[pymupdf.Document]:
+        """
+        Removes the least recently used documents that aren't leased until at most
+        `max_open` documents are left, returns the removed documents to be closed. Must
+        be called with the lock held
+        """
+        closing = []
+        for key in list(self._documents):
+            if len(self._documents) <= self.max_open:
+                break
+            if key not in self._leases:
+                closing.append(self._documents.pop(key))
+                del self._locks[key]
+        return closing
+
+    def release_grafts(self, target: pymupdf.Document) -> None:
+        """
+        Drops the graft maps `target` keeps of documents that aren't open in the pool.
+        Copying a page to another document (`insert_pdf`, `show_pdf_page`) keeps a graft
+        map of its document on the target, which keeps the document open even after the
+        pool closes it
+        """
+        with self._lock:
+            open_ids = {x._graft_id for x in self._documents.values()}
+
+        for x in [x for x in target.Graftmaps if x not in open_ids]:
+            del target.Graftmaps[x]
+
+    def close(self) -> None:
+        """
+        Closes all the documents that aren't leased
+        """
+        with self._lock:
+            closing = [
+                self._documents.pop(x)
+                for x in list(self._documents)
+                if x not in self._leases
+            ]
+            for x in list(self._locks):
+                if x not in self._leases:
+                    del self._locks[x]
+
+        for x in closing:
+            x.close()
+
+
+# Used by the renderers that aren't given a pool
+default_pool = DocumentPool()
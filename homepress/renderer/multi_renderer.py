@@ -1,31 +1,83 @@
+import bisect
+import functools
+import itertools
+from typing import Iterable, Iterator
+
 import pymupdf
 
-from .renderer_abc import Renderer, Size
+from .colorspace import Colorspace
+from .renderer_abc import EncodedImage, Renderer, Size
 
 
 class MultiRenderer(Renderer):
     """
     A renderer to combine multiple different renderers
+
+    The pages of the renderers are only counted once they are needed
     """
 
     def __init__(self, renderers: list[Renderer]) -> None:
         self.renderers = renderers
-        self.lens = list(map(len, renderers))
+
+    @functools.cached_property
+    def lens(self) -> list[int]:
+        return list(map(len, self.renderers))
+
+    @functools.cached_property
+    def offsets(self) -> list[int]:
+        # offsets[i] is the first page of renderers[i], the last one is the total length
+        return [0, *itertools.accumulate(self.lens)]
 
     def __len__(self) -> int:
-        return sum(self.lens)
+        return self.offsets[-1]
+
+    def _renderer_index(self, pageno: int) -> int:
+        if not 0 <= pageno < self.offsets[-1]:
+            raise IndexError(f"Page out of range: {pageno}/{len(self)}")
+        return bisect.bisect_right(self.offsets, pageno) - 1
 
     def _localise_pageno(self, pageno: int) -> tuple[Renderer, int]:
-        idx = pageno
-        for i, x in enumerate(self.lens):
-            if (idx - x) < 0:
-                return (self.renderers[i], idx)
-            idx -= x
-        raise IndexError(f"Page out of range: {pageno}/{len(self)}")
+        i = self._renderer_index(pageno)
+        return (self.renderers[i], pageno - self.offsets[i])
+
+    def localise(self, pages: Iterable[int]) -> list[tuple[Renderer, list[int]]]:
+        """
+        Maps the given pages to the renderers they belong to. Consecutive pages of the
+        same renderer are grouped together, so the order of `pages` is preserved:
+
+        ```python
+        >>> MultiRenderer([a, b]).localise([0, 1, len(a), 2])
+        [(a, [0, 1]), (b, [0]), (a, [2])]
+        ```
+        """
+        groups = []
+        i = None
+        for x in pages:
+            # Sequential pages mostly stay within the same renderer, skip the search
+            if i is None or not self.offsets[i] <= x < self.offsets[i + 1]:
+                i = self._renderer_index(x)
+                groups.append((self.renderers[i], []))
+            groups[-1][1].append(x - self.offsets[i])
+        return groups
+
+    def render(
+        self, page: int, size: Size, colorspace: Colorspace = "rgb"
+    ) -> pymupdf.Pixmap:
+        r, p = self._localise_pageno(page)
+        return r.render(p, size, colorspace)
+
+    def render_many(
+        self, pages: Iterable[int], size: Size, colorspace: Colorspace = "rgb"
+    ) -> Iterator[pymupdf.Pixmap]:
+        # Hand each renderer its pages as one batch
+        for r, p in self.localise(pages):
+            yield from r.render_many(p, size, colorspace)
 
-    def render(self, page: int, size: Size) -> pymupdf.Pixmap:
+    def extract_image(
+        self, page: int, size: Size, colorspace: Colorspace = "rgb"
+    ) -> EncodedImage | None:
         r, p = self._localise_pageno(page)
-        return r.render(p, size)
+        return r.extract_image(p, size, colorspace)
 
     def render_preview(self, page: int) -> pymupdf.Pixmap:
         r, p = self._localise_pageno(page)
@@ -34,3 +86,25 @@ class MultiRenderer(Renderer):
     def get_text(self, page: int) -> str:
         r, p = self._localise_pageno(page)
         return r.get_text(p)
+
+    def native_size(self, page: int) -> Size | None:
+        r, p = self._localise_pageno(page)
+        return r.native_size(p)
+
+    def is_vector(self, page: int) -> bool:
+        r, p = self._localise_pageno(page)
+        return r.is_vector(p)
+
+    def show_page(
+        self, page: int, target: pymupdf.Page, rect: pymupdf.Rect, rotate: int = 0
+    ) -> None:
+        r, p = self._localise_pageno(page)
+        r.show_page(p, target, rect, rotate)
+
+    def copy_page(self, page: int, target: pymupdf.Document) -> None:
+        r, p = self._localise_pageno(page)
+        r.copy_page(p, target)
+
+    def copy_pages(self, pages: Iterable[int], target: pymupdf.Document) -> None:
+        for r, p in self.localise(pages):
+            r.copy_pages(p, target)
@@ -1,10 +1,19 @@
 import array
+import contextlib
+import os
 from pathlib import Path
+from typing import Iterable, Iterator
 
 import pymupdf
 
 from ..layout.pages import clip
-from .renderer_abc import Renderer, Size
+from .colorspace import Colorspace, threshold
+from .disk_cache import DiskCache
+from .document_pool import DocumentPool, default_pool
+from .renderer_abc import EncodedImage, Renderer, Size
+
+# Pdf names of the colorspaces with the given number of components
+_device_colorspaces = {1: "DeviceGray", 3: "DeviceRGB", 4: "DeviceCMYK"}
 
 
 class MuPDFRenderer(Renderer):
@@ -12,6 +21,9 @@ class MuPDFRenderer(Renderer):
     Renderer based on PyMuPDF package
 
     supports several extensions including pdf, epub, cbz, cbr, fb2
+
+    MuPDF documents can't be used by several threads at once, so the document is leased
+    from the pool for every call, which gives the calling thread exclusive use of it
     """
 
     supported_extensions = [
@@ -25,42 +37,221 @@ class MuPDFRenderer(Renderer):
         "txt",
     ]
 
-    def __init__(self, file: str | Path) -> None:
+    # Filters of the images that `extract_image` passes through, others are rendered
+    passthrough_filters = ["DCTDecode", "JPXDecode", "CCITTFaxDecode"]
+
+    def __init__(
+        self, file: str | Path, cache: DiskCache = None, pool: DocumentPool = None
+    ) -> None:
         self.file = Path(file)
-        if not self.file.exists():
+        if not os.path.exists(file):
             raise FileNotFoundError(f'file "{self.file}" not found')
 
-        self.fp = None
+        self.cache = cache
+        # Documents are leased from the pool when needed instead of being kept open
+        self.pool = pool
+        self._len = None
+
+    def _pool(self) -> DocumentPool:
+        return self.pool if self.pool is not None else default_pool
+
+    @contextlib.contextmanager
+    def _document(self) -> Iterator[pymupdf.Document]:
+        """
+        Leases the document from the pool, it's opened again if it was closed
+        """
+        with self._pool().lease(
+            (self.file, "document"), lambda: pymupdf.open(self.file)
+        ) as doc:
+            yield doc
 
-    def _lazy_load(self) -> None:
+    @contextlib.contextmanager
+    def _pdf_document(self) -> Iterator[pymupdf.Document]:
         """
-        Lazy loads the pdf file
+        Leases the document as a pdf, other formats are converted to pdf
         """
-        if self.fp is None:
-            self.fp = pymupdf.open(self.file)
+        with self._document() as doc:
+            if doc.is_pdf:
+                yield doc
+                return
 
-    def render(self, page: int, size: Size) -> pymupdf.Pixmap:
-        self._lazy_load()
+            with self._pool().lease(
+                (self.file, "pdf"), lambda: pymupdf.open("pdf", doc.convert_to_pdf())
+            ) as pdf:
+                yield pdf
 
+    def render(
+        self, page: int, size: Size, colorspace: Colorspace = "rgb"
+    ) -> pymupdf.Pixmap:
         if min(size) <= 0:
             raise ValueError(f"Resolution has to be non-zero: {size}")
 
-        page = self.fp[page]
+        with self._document() as doc:
+            return self._render_page(doc[page], size, colorspace)
+
+    def render_many(
+        self, pages: Iterable[int], size: Size, colorspace: Colorspace = "rgb"
+    ) -> Iterator[pymupdf.Pixmap]:
+        if min(size) <= 0:
+            raise ValueError(f"Resolution has to be non-zero: {size}")
+
+        for x in pages:
+            # The lease is returned before yielding, as the generator may be resumed
+            # by another thread
+            with self._document() as doc:
+                pixmap = self._render_page(doc[x], size, colorspace)
+            yield pixmap
+
+    def _render_page(
+        self, page: pymupdf.Page, size: Size, colorspace: Colorspace
+    ) -> pymupdf.Pixmap:
         p_size = page.cropbox
         p_size = (p_size.width, p_size.height)
         new_size = clip(p_size, size)  # Final size
 
         scale_factor = new_size[0] / p_size[0]  # Scale factor
 
+        if self.cache is not None:
+            key = self.cache.key(
+                self.file,
+                page.number,
+                round(new_size[0]),
+                round(new_size[1]),
+                colorspace,
+            )
+            if (img := self.cache.get(key)) is not None:
+                return img
+
         # Convert the page to PixMap based on given scaling and clip the page render area to the cropbox of the page, also render annotations
         img = page.get_pixmap(
             matrix=pymupdf.Matrix(scale_factor, scale_factor),
             clip=page.cropbox,
             annots=True,
+            colorspace=pymupdf.csRGB if colorspace == "rgb" else pymupdf.csGRAY,
         )
+        if colorspace == "mono":
+            img = threshold(img)
+
+        if self.cache is not None:
+            self.cache.put(key, img)
 
         return img
 
+    def extract_image(
+        self, page: int, size: Size, colorspace: Colorspace = "rgb"
+    ) -> EncodedImage | None:
+        """
+        The stream of the image of pages that are nothing but an upright image covering
+        the whole page, as long as `size` is at least the size of the image (rendering
+        smaller has to resample the image). Only images the output can use as is are
+        passed through, see `passthrough_filters`
+        """
+        with self._document() as doc:
+            if not doc.is_pdf:
+                return None
+            return self._extract_image(doc, doc[page], size, colorspace)
+
+    def _extract_image(
+        self,
+        doc: pymupdf.Document,
+        page: pymupdf.Page,
+        size: Size,
+        colorspace: Colorspace,
+    ) -> EncodedImage | None:
+
+        # Reading the resources of the page is cheap, unlike `_single_image` and the
+        # other checks below that interpret its contents, and rules out most pages
+        images = page.get_images(full=True)
+        if len(images) != 1:
+            return None
+        xref = images[0][0]
+
+        def key(name: str) -> tuple[str, str]:
+            return doc.xref_get_key(xref, name)
+
+        filter = key("Filter")
+        if filter[0] != "name" or filter[1][1:] not in self.passthrough_filters:
+            return None
+        if any(
+            key(x)[0] != "null"
+            for x in ["SMask", "Mask", "Decode", "ImageMask", "SMaskInData"]
+        ):
+            return None
+
+        decode_parms = key("DecodeParms")
+        if decode_parms[0] not in (
+            "null",
+            "dict",
+        ):  # Like a reference to another object
+            return None
+
+        # Other colorspaces (like Separation or Lab) don't mean the same when the image is
+        # stored in the device colorspace of the same components
+        if not self._passthrough_colorspace(doc, key("ColorSpace")):
+            return None
+
+        if page.rotation != 0 or (single := self._single_image(page)) is None:
+            return None
+        info, bbox = single
+
+        a, b, c, d, _, _ = info["transform"]
+        cropbox = page.cropbox
+        tolerance = 0.01 * max(cropbox.width, cropbox.height)
+        if (
+            b != 0
+            or c != 0
+            or a <= 0
+            or d <= 0
+            or abs(bbox.width - cropbox.width) > tolerance
+            or abs(bbox.height - cropbox.height) > tolerance
+        ):
+            return None
+
+        # Only the image may be visible, text is allowed if it's invisible (like OCR)
+        if (
+            page.first_annot is not None
+            or page.get_drawings()
+            or any(x["type"] != 3 for x in page.get_texttrace())
+        ):
+            return None
+
+        width, height = info["width"], info["height"]
+        if clip((cropbox.width, cropbox.height), size)[0] < width - 0.5:
+            return None
+
+        n = info["colorspace"]
+        bpc = info["bpc"]
+        if n not in _device_colorspaces:
+            return None
+        if colorspace == "gray" and n != 1 or colorspace == "mono" and bpc != 1:
+            return None
+
+        # ICC based colorspaces are stored as the device colorspace of the same
+        # components
+        return EncodedImage(
+            width,
+            height,
+            _device_colorspaces[n],
+            bpc,
+            filter[1][1:],
+            doc.xref_stream_raw(xref),
+            decode_parms[1] if decode_parms[0] == "dict" else "",
+        )
+
+    @staticmethod
+    def _passthrough_colorspace(doc: pymupdf.Document, value: tuple[str, str]) -> bool:
+        """
+        Whether an image in the colorspace `value` (see `pymupdf.Document.xref_get_key`)
+        can be stored in a device colorspace, true for device and ICC based colorspaces
+        """
+        kind, value = value
+        if kind == "xref":
+            value = doc.xref_object(int(value.split()[0]), compressed=True)
+        value = value.strip()
+        return value[1:] in _device_colorspaces.values() or value.startswith(
+            "[/ICCBased"
+        )
+
     def render_preview(self, page: int) -> pymupdf.Pixmap:
         """
         Renders a preview of the given page, with a resolution of 420 max in either
@@ -72,12 +263,85 @@ class MuPDFRenderer(Renderer):
         """
         Get text from the given page
         """
-        self._lazy_load()
+        with self._document() as doc:
+            return doc[page].get_text()
+
+    def _single_image(self, page: pymupdf.Page) -> tuple[dict, pymupdf.Rect] | None:
+        """
+        The image info (see `pymupdf.Page.get_image_info`) and the visible bbox of the
+        image of pages that are a single image covering most of the page
+        """
+        images = page.get_image_info()
+        if len(images) != 1:
+            return None
+
+        cropbox = page.cropbox
+        bbox = pymupdf.Rect(images[0]["bbox"]) & cropbox
+        # Other content of the page may need a higher resolution than the image
+        if bbox.is_empty or bbox.get_area() < 0.9 * cropbox.get_area():
+            return None
+        return images[0], bbox
+
+    def native_size(self, page: int) -> Size | None:
+        """
+        For pages that are a single image covering the page (like scanned pdfs), the size
+        the page is rendered at to show the image at its own resolution
+        """
+        with self._document() as doc:
+            return self._native_size(doc[page])
+
+    def _native_size(self, page: pymupdf.Page) -> Size | None:
+        if (single := self._single_image(page)) is None:
+            return None
+        image, bbox = single
+
+        width, height = image["width"], image["height"]
+        transform = image["transform"]
+        if abs(transform[1]) > abs(transform[0]):  # Placed rotated by 90 degrees
+            width, height = height, width
+
+        cropbox = page.cropbox
+
+        return (
+            cropbox.width * width / bbox.width,
+            cropbox.height * height / bbox.height,
+        )
+
+    def is_vector(self, page: int) -> bool:
+        """
+        Pages with annotations are rendered as raster as annotations are not carried over
+        when showing a page
+        """
+        with self._document() as doc:
+            return doc[page].first_annot is None
+
+    def show_page(
+        self, page: int, target: pymupdf.Page, rect: pymupdf.Rect, rotate: int = 0
+    ) -> None:
+        with self._pdf_document() as pdf:
+            target.show_pdf_page(rect, pdf, page, rotate=rotate)
+        self._pool().release_grafts(target.parent)
+
+    def copy_page(self, page: int, target: pymupdf.Document) -> None:
+        with self._pdf_document() as pdf:
+            # Keep the graft map across calls so that resources shared between pages
+            # are only copied once. It keeps the document open until the pool closes
+            # the document, or `copy_pages` finishes it
+            target.insert_pdf(pdf, from_page=page, to_page=page, final=False)
+        self._pool().release_grafts(target)
 
-        page = self.fp[page]
-        txt = page.get_text()
-        return txt
+    def copy_pages(self, pages: Iterable[int], target: pymupdf.Document) -> None:
+        pages = list(pages)
+        with self._pdf_document() as pdf:
+            for i, x in enumerate(pages):
+                # The graft map shares the resources of the pages, and is dropped with
+                # the last page so that the target doesn't keep the document open
+                target.insert_pdf(
+                    pdf, from_page=x, to_page=x, final=i == len(pages) - 1
+                )
 
     def __len__(self):
-        self._lazy_load()
-        return self.fp.page_count
+        if self._len is None:
+            with self._document() as doc:
+                self._len = doc.page_count
+        return self._len
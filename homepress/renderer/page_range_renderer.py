@@ -1,37 +1,186 @@
-from typing import SupportsIndex
+import bisect
+import itertools
+from collections.abc import Sequence
+from typing import Iterable, Iterator, SupportsIndex
 
-from pymupdf import Pixmap
+from pymupdf import Document, Page, Pixmap, Rect
 
-from .renderer_abc import Renderer, Size
+from .colorspace import Colorspace
+from .renderer_abc import EncodedImage, Renderer, Size
+
+type PageSelection = int | range | Iterable[int | range]
+
+
+class PageRanges(Sequence):
+    """
+    A sequence of page numbers stored as a list of ranges, so that large selections like
+    `range(1, 1000000)` take constant memory. Indexing is a binary search over the ranges.
+
+    Accepts any number of page numbers, ranges, other `PageRanges` or iterables of these:
+
+    ```python
+    >>> list(PageRanges(1, range(4, 7), [8, 9]))
+    [1, 4, 5, 6, 8, 9]
+    ```
+    """
+
+    def __init__(self, *page_range: PageSelection) -> None:
+        self.ranges: list[range] = []
+        for x in page_range:
+            self._add(x)
+        # offsets[i] is the index of the first page of ranges[i], the last one is the length
+        self.offsets = [0, *itertools.accumulate(map(len, self.ranges))]
+
+    def _add(self, x: PageSelection) -> None:
+        if isinstance(x, PageRanges):
+            for y in x.ranges:
+                self._add_range(y)
+        elif isinstance(x, range):
+            self._add_range(x)
+        elif isinstance(x, SupportsIndex):
+            x = x.__index__()
+            self._add_range(range(x, x + 1))
+        else:
+            for y in x:
+                self._add(y)
+
+    def _add_range(self, r: range) -> None:
+        if len(r) == 0:
+            return
+        # Join consecutive pages into a single range
+        if self.ranges:
+            last = self.ranges[-1]
+            if last.step == 1 and (r.step == 1 or len(r) == 1) and last.stop == r.start:
+                self.ranges[-1] = range(last.start, r[-1] + 1)
+                return
+        self.ranges.append(r)
+
+    @classmethod
+    def parse(cls, v: str) -> "PageRanges":
+        """
+        Parses a comma separated list of page numbers and page ranges like `1,4,6-10`,
+        where `6-10` are the pages from 6 upto (but not including) 10
+        """
+        pages = []
+        for x in v.split(","):
+            try:
+                pages.append(int(x))
+            except ValueError:
+                pages.append(range(*map(int, x.split("-"))))
+        return cls(pages)
+
+    def __len__(self) -> int:
+        return self.offsets[-1]
+
+    def __getitem__(self, idx: int) -> int:
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(f"Page index out of range: {idx}/{len(self)}")
+        i = bisect.bisect_right(self.offsets, idx) - 1
+        return self.ranges[i][idx - self.offsets[i]]
+
+    def __iter__(self) -> Iterator[int]:
+        return itertools.chain.from_iterable(self.ranges)
+
+    def __contains__(self, page: int) -> bool:
+        return any(page in x for x in self.ranges)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, PageRanges):
+            return self.ranges == other.ranges
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"PageRanges({', '.join(map(repr, self.ranges))})"
+
+    def bounds(self) -> tuple[int, int] | None:
+        """
+        The smallest and the largest page number, None if empty
+        """
+        if not self.ranges:
+            return None
+        # The first and last items of a range are its extremes
+        return (
+            min(min(x[0], x[-1]) for x in self.ranges),
+            max(max(x[0], x[-1]) for x in self.ranges),
+        )
+
+    def select(self, indices: "PageRanges") -> "PageRanges":
+        """
+        The pages at the given indices of this sequence, i.e. `[self[x] for x in indices]`,
+        without expanding contiguous selections into single pages
+        """
+        bounds = indices.bounds()
+        if bounds is not None and (bounds[0] < 0 or bounds[1] >= len(self)):
+            raise IndexError(f"Page indices out of range: {bounds}/{len(self)}")
+
+        selected = []
+        for r in indices.ranges:
+            if r.step != 1:
+                selected.extend(self[x] for x in r)
+                continue
+
+            # Slice every range that overlaps with the selected indices
+            i = bisect.bisect_right(self.offsets, r.start) - 1
+            while i < len(self.ranges) and self.offsets[i] < r.stop:
+                offset = self.offsets[i]
+                selected.append(
+                    self.ranges[i][max(r.start - offset, 0) : r.stop - offset]
+                )
+                i += 1
+        return PageRanges(selected)
 
 
 class PageRangeRenderer(Renderer):
-    def __init__(
-        self, renderer: Renderer, *page_range: list[int | SupportsIndex]
-    ) -> None:
+    def __init__(self, renderer: Renderer, *page_range: PageSelection) -> None:
         self.renderer = renderer
-        self.pages = []
-        for x in page_range:
-            # If its a single page number
-            if isinstance(x, int):
-                self.pages.append(x)
-            # If its an iterable of page numbers
-            else:
-                self.pages.extend(x)
-
-        renderer_len = len(self.renderer)
-        for x in self.pages:
-            if x >= renderer_len:
-                raise IndexError("Given page range out of renderer range")
+        self.pages = PageRanges(*page_range)
+
+        bounds = self.pages.bounds()
+        if bounds is not None and (bounds[0] < 0 or bounds[1] >= len(self.renderer)):
+            raise IndexError("Given page range out of renderer range")
+
+        # Select from the pages of a nested range renderer directly instead of stacking
+        if isinstance(renderer, PageRangeRenderer):
+            self.renderer = renderer.renderer
+            self.pages = renderer.pages.select(self.pages)
 
     def __len__(self) -> int:
         return len(self.pages)
 
-    def render(self, page: int, size: Size) -> Pixmap:
-        return self.renderer.render(self.pages[page], size)
+    def render(self, page: int, size: Size, colorspace: Colorspace = "rgb") -> Pixmap:
+        return self.renderer.render(self.pages[page], size, colorspace)
+
+    def render_many(
+        self, pages: Iterable[int], size: Size, colorspace: Colorspace = "rgb"
+    ) -> Iterator[Pixmap]:
+        return self.renderer.render_many(
+            (self.pages[x] for x in pages), size, colorspace
+        )
+
+    def extract_image(
+        self, page: int, size: Size, colorspace: Colorspace = "rgb"
+    ) -> EncodedImage | None:
+        return self.renderer.extract_image(self.pages[page], size, colorspace)
 
     def render_preview(self, page: int) -> Pixmap:
         return self.renderer.render_preview(self.pages[page])
 
     def get_text(self, page: int) -> str:
         return self.renderer.get_text(self.pages[page])
+
+    def native_size(self, page: int) -> Size | None:
+        return self.renderer.native_size(self.pages[page])
+
+    def is_vector(self, page: int) -> bool:
+        return self.renderer.is_vector(self.pages[page])
+
+    def show_page(self, page: int, target: Page, rect: Rect, rotate: int = 0) -> None:
+        self.renderer.show_page(self.pages[page], target, rect, rotate)
+
+    def copy_page(self, page: int, target: Document) -> None:
+        self.renderer.copy_page(self.pages[page], target)
+
+    def copy_pages(self, pages: Iterable[int], target: Document) -> None:
+        self.renderer.copy_pages((self.pages[x] for x in pages), target)
@@ -1,47 +1,222 @@
+import contextlib
+import os
+import threading
+from collections import OrderedDict
 from pathlib import Path
+from typing import Iterable, Iterator
 
 import PIL.Image
 from PIL.Image import Image
-from pymupdf import Pixmap, csRGB
+from pymupdf import Pixmap, csGRAY, csRGB
 
 from ..layout.pages import clip
-from .renderer_abc import Renderer, Size
+from .colorspace import Colorspace, threshold
+from .disk_cache import DiskCache
+from .document_pool import DocumentPool
+from .renderer_abc import EncodedImage, Renderer, Size
 
 PIL.Image.init()
 
+# Recently decoded images shared by all the PILRenderers of the process, limited to
+# PILRenderer.decoded_cache_bytes
+_decoded_images: OrderedDict[tuple, Image] = OrderedDict()
+_decoded_bytes = 0
+_decoded_lock = threading.Lock()
+
+# Transpositions that show an image upright, by its exif orientation
+_orientation_transpose = {
+    2: PIL.Image.Transpose.FLIP_LEFT_RIGHT,
+    3: PIL.Image.Transpose.ROTATE_180,
+    4: PIL.Image.Transpose.FLIP_TOP_BOTTOM,
+    5: PIL.Image.Transpose.TRANSPOSE,
+    6: PIL.Image.Transpose.ROTATE_270,
+    7: PIL.Image.Transpose.TRANSVERSE,
+    8: PIL.Image.Transpose.ROTATE_90,
+}
+
+# Counterclockwise rotation of the exif orientations that don't mirror the image
+_orientation_rotate = {1: 0, 3: 180, 6: 270, 8: 90}
+
+
+def _orientation(im: Image) -> int:
+    """
+    The exif orientation of the current frame, 1 if the image is stored upright
+    """
+    return im.getexif().get(0x0112, 1)
+
+
+def _image_bytes(im: Image) -> int:
+    return im.width * im.height * len(im.getbands())
+
 
 def _pil_to_pixmap(im: Image) -> Pixmap:
-    w, h = im.size
-    white_bg = PIL.Image.new("RGBA", im.size, "WHITE")
-    white_bg.alpha_composite(im)
-    im = white_bg.tobytes()
-    return Pixmap(csRGB, w, h, im, True)
+    """
+    Converts the image to an opaque RGB or grayscale pixmap, transparent areas are
+    flattened onto a white background
+    """
+    if im.mode not in ("RGB", "L", "RGBA", "LA"):
+        im = im.convert("RGBA" if im.has_transparency_data else "RGB")
+
+    if im.mode in ("RGBA", "LA"):
+        # Paste the color channels onto white using the alpha channel as mask
+        white_bg = PIL.Image.new(im.mode[:-1], im.size, "WHITE")
+        white_bg.paste(im, mask=im.getchannel("A"))
+        im = white_bg
+
+    colorspace = csGRAY if im.mode == "L" else csRGB
+    return Pixmap(colorspace, im.width, im.height, im.tobytes(), False)
 
 
 class PILRenderer(Renderer):
+    """
+    Renderer based on the Pillow package
+
+    Every frame of a multi frame image (like a scanned tiff) is a page, other images
+    have a single page
+    """
+
     supported_extensions = [
         k.strip(".") for k, v in PIL.Image.EXTENSION.items() if v in PIL.Image.OPEN
     ]
 
-    def __init__(self, file: Path | str) -> None:
+    # Only the frames of these formats are treated as pages, other files aren't opened
+    # to count their frames
+    multi_frame_extensions = ["tif", "tiff", "gif", "dcx"]
+
+    def __init__(
+        self, file: Path | str, cache: DiskCache = None, pool: DocumentPool = None
+    ) -> None:
+        # Images are only open while they are decoded, so `pool` isn't used
         self.file = Path(file)
-        if not self.file.exists():
+        if not os.path.exists(file):
             raise FileNotFoundError(f'file "{self.file}" not found')
 
+        self.cache = cache
+        # Files of other formats are a single page, the others are counted when needed
+        ext = os.path.splitext(file)[1][1:].lower()
+        self._len = None if ext in self.multi_frame_extensions else 1
+
+    # Keep upto this many bytes of recently decoded images in memory, so that rendering
+    # an image again at the same or a smaller size (like `render_preview` after `render`)
+    # doesn't decode it again. Images are only decoded as large as the render needs, so
+    # a larger render after a smaller one still decodes again. 0 disables the cache
+    decoded_cache_bytes: int = 0
+
     def __len__(self) -> int:
-        return 1
+        if self._len is None:
+            # Only reads the frame headers, the frames aren't decoded
+            with PIL.Image.open(self.file) as im:
+                self._len = getattr(im, "n_frames", 1)
+        return self._len
+
+    def _check_page(self, page: int) -> None:
+        if not 0 <= page < len(self):
+            raise IndexError(f"Page out of range: {page}/{len(self)}")
 
-    def render(self, page: int, size: Size) -> Pixmap:
+    def render(self, page: int, size: Size, colorspace: Colorspace = "rgb") -> Pixmap:
         """
-        Converts the given input image to a Pixmap based on the size.
+        Converts the given frame of the input image to a Pixmap based on the size.
         """
-        if page != 0:
-            raise IndexError("Image files only support index 0")
+        self._check_page(page)
 
         if min(size) <= 0:
             raise ValueError(f"render resolution can't be zero: {size}")
 
-        im = PIL.Image.open(self.file).convert("RGBA")
+        # Only the header is read here, the image is decoded after the cache lookup
+        with PIL.Image.open(self.file) as im:
+            if page != 0:
+                im.seek(page)
+            return self._render_image(im, page, size, colorspace)
+
+    def render_many(
+        self, pages: Iterable[int], size: Size, colorspace: Colorspace = "rgb"
+    ) -> Iterator[Pixmap]:
+        """
+        Same as `render`, increasing frames are read from a single open file
+        """
+        if min(size) <= 0:
+            raise ValueError(f"render resolution can't be zero: {size}")
+
+        im = None
+        frame = None
+        # Only the files are closed, decoded images may be kept by the decoded cache
+        with contextlib.ExitStack() as files:
+            for x in pages:
+                self._check_page(x)
+                # A frame can only be decoded once from an open image, and seeking back
+                # to earlier frames isn't supported by all the formats
+                if im is None or x <= frame:
+                    files.close()
+                    im = files.enter_context(PIL.Image.open(self.file))
+                if x != 0:
+                    im.seek(x)
+                frame = x
+                yield self._render_image(im, x, size, colorspace)
+
+    def _decode(
+        self, im: Image, page: int, size: tuple[int, int], gray: bool = False
+    ) -> Image:
+        """
+        Decode the image at `size` or larger. JPEG images are decoded at a reduced scale
+        where possible, which is several times faster than decoding them at full scale,
+        and only their luminance is decoded if `gray` is set. The returned image may be
+        shared and must not be modified.
+        """
+        global _decoded_bytes
+
+        stat = os.stat(self.file)
+        key = (str(self.file.absolute()), stat.st_size, stat.st_mtime_ns, page)
+        with _decoded_lock:
+            decoded = _decoded_images.get(key)
+            if decoded is not None:
+                _decoded_images.move_to_end(key)
+
+        # A cached image can be reused if it was decoded at full scale or large enough,
+        # and wasn't decoded as grayscale for a grayscale render of a color image
+        if (
+            decoded is not None
+            and (
+                decoded.size == im.size
+                or (decoded.width >= size[0] and decoded.height >= size[1])
+            )
+            and (gray or decoded.mode not in ("L", "LA") or im.mode in ("L", "LA"))
+        ):
+            return decoded
+
+        # Only has an effect on JPEG images
+        im.draft("L" if gray else None, size)
+        if im.mode in ("RGB", "RGBA", "L", "LA"):
+            im.load()
+            # Seeking to another frame replaces the image data, so only the frames of
+            # multi-frame files have to be copied to be cached
+            if len(self) > 1 and self.decoded_cache_bytes > 0:
+                decoded = im.copy()
+            else:
+                decoded = im
+        else:
+            decoded = im.convert("RGBA" if im.has_transparency_data else "RGB")
+
+        nbytes = _image_bytes(decoded)
+        if nbytes <= self.decoded_cache_bytes:
+            with _decoded_lock:
+                if (old := _decoded_images.pop(key, None)) is not None:
+                    _decoded_bytes -= _image_bytes(old)
+                _decoded_images[key] = decoded
+                _decoded_bytes += nbytes
+                while _decoded_bytes > self.decoded_cache_bytes:
+                    _, evicted = _decoded_images.popitem(last=False)
+                    _decoded_bytes -= _image_bytes(evicted)
+
+        return decoded
+
+    def _render_image(
+        self, im: Image, page: int, size: Size, colorspace: Colorspace
+    ) -> Pixmap:
+        # Images stored sideways are rendered to the transposed size and turned upright
+        # at the end
+        orientation = _orientation(im)
+        if orientation in (5, 6, 7, 8):
+            size = (size[1], size[0])
 
         # Check for minimum sizes
         if (min_size := max(im.size) / min(im.size)) > min(size):
@@ -50,18 +225,93 @@ class PILRenderer(Renderer):
             )
 
         clipped_size = clip(im.size, size)
+        target_size = (int(clipped_size[0]), int(clipped_size[1]))
+
+        if self.cache is not None:
+            key = self.cache.key(
+                self.file,
+                page,
+                round(clipped_size[0]),
+                round(clipped_size[1]),
+                colorspace,
+                orientation,
+            )
+            if (pixmap := self.cache.get(key)) is not None:
+                return pixmap
+
+        full_size = im.size
+        gray = colorspace != "rgb"
+        im = self._decode(im, page, target_size, gray)
+        if gray and im.mode not in ("L", "LA"):
+            # Converted before resizing, so that only one channel is resampled
+            im = im.convert("LA" if "A" in im.mode else "L")
         if (
-            clipped_size[0] * clipped_size[1] < im.width * im.height
+            clipped_size[0] * clipped_size[1] < full_size[0] * full_size[1]
         ):  # If the clipped size is less than the render size
-            im = im.resize((int(clipped_size[0]), int(clipped_size[1])))
+            if im.size != target_size:
+                # Reduce by an integer factor first, then resample the rest of the way
+                im = im.resize(target_size, reducing_gap=3.0)
+
+        if orientation in _orientation_transpose:
+            im = im.transpose(_orientation_transpose[orientation])
+
+        pixmap = _pil_to_pixmap(im)
+        if colorspace == "mono":
+            pixmap = threshold(pixmap)
+        if self.cache is not None:
+            self.cache.put(key, pixmap)
+
+        return pixmap
+
+    def native_size(self, page: int) -> Size:
+        """
+        The size of the given frame as it is shown, only the header is read
+        """
+        self._check_page(page)
+        with PIL.Image.open(self.file) as im:
+            if page != 0:
+                im.seek(page)
+            if _orientation(im) in (5, 6, 7, 8):
+                return im.height, im.width
+            return im.size
+
+    def extract_image(
+        self, page: int, size: Size, colorspace: Colorspace = "rgb"
+    ) -> EncodedImage | None:
+        """
+        The contents of JPEG files that are shown at their own size at `size`. Images with
+        an exif orientation that mirrors them are rendered instead, only rotations can be
+        applied when placing the image
+        """
+        self._check_page(page)
+        with PIL.Image.open(self.file) as im:
+            if im.format != "JPEG" or im.mode not in ("L", "RGB"):
+                return None
+            if colorspace == "mono" or colorspace == "gray" and im.mode != "L":
+                return None
+            if (rotate := _orientation_rotate.get(_orientation(im))) is None:
+                return None
+
+            width, height = im.size
+            shown = (height, width) if rotate % 180 == 90 else (width, height)
+            if clip(shown, size)[0] < shown[0] - 0.5:  # Has to be downscaled
+                return None
+
+            pdf_colorspace = "DeviceRGB" if im.mode == "RGB" else "DeviceGray"
 
-        return _pil_to_pixmap(im)
+        return EncodedImage(
+            width,
+            height,
+            pdf_colorspace,
+            8,
+            "DCTDecode",
+            self.file.read_bytes(),
+            rotate=rotate,
+        )
 
     def render_preview(self, page: int) -> Pixmap:
         """
         Scale down the image to a max of 420 in either dimensions and returns the
         pixmap after doing that
         """
-        if page != 0:
-            raise IndexError("Image files only support index 0")
         return self.render(page, size=(420, 420))
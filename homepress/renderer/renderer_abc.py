@@ -1,25 +1,128 @@
 from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple
 
-from pymupdf import Pixmap
+from pymupdf import Document, Page, Pixmap, Rect
+
+from .colorspace import Colorspace
+from .disk_cache import DiskCache
+from .document_pool import DocumentPool
 
 type Size = tuple[float, float]
 
 
+class EncodedImage(NamedTuple):
+    """
+    An image encoded as the stream of a pdf image object
+    """
+
+    width: int
+    height: int
+    colorspace: str  # Name of the pdf colorspace
+    bpc: int  # Bits per component
+    filter: str  # Name of the pdf filter the data is encoded with
+    data: bytes
+    decode_parms: str = ""  # Pdf dictionary of the filter parameters, if any
+    rotate: int = 0  # Degrees to rotate the image counterclockwise by when showing it
+
+    @property
+    def size(self) -> tuple[int, int]:
+        """
+        The size of the image as it is shown, after rotating it
+        """
+        if self.rotate % 180 == 90:
+            return self.height, self.width
+        return self.width, self.height
+
+
 class Renderer:  # pragma: no cover
+    """
+    Renders the pages of an input.
+
+    Renderers can be used from several threads at once, like by jobs of one `Press`
+    running in parallel. Shared state (open documents, caches) is guarded by the
+    renderers themselves, the returned pixmaps and images belong to the caller. The
+    documents passed to `show_page` and `copy_page` must only be used by one thread at
+    a time. Copies in other processes get their own locks and documents.
+    """
+
     supported_extensions: list[str] = []
 
-    def __init__(self, file: str | Path) -> None:
+    def __init__(
+        self, file: str | Path, cache: DiskCache = None, pool: DocumentPool = None
+    ) -> None:
         pass
 
-    def render(self, page: int, size: Size) -> Pixmap:
+    def render(self, page: int, size: Size, colorspace: Colorspace = "rgb") -> Pixmap:
+        """
+        Render the page to fit within `size`. The pixmap is in color for "rgb", grayscale
+        for "gray" and grayscale with only black and white for "mono"
+        """
         return b""
 
+    def render_many(
+        self, pages: Iterable[int], size: Size, colorspace: Colorspace = "rgb"
+    ) -> Iterator[Pixmap]:
+        """
+        Render the given pages at the same size, yielding the pixmaps in order. Renderers
+        override this to share work between the pages of a batch.
+        """
+        for x in pages:
+            yield self.render(x, size, colorspace)
+
+    def extract_image(
+        self, page: int, size: Size, colorspace: Colorspace = "rgb"
+    ) -> EncodedImage | None:
+        """
+        The page as an already encoded image, for pages made of a single image (like
+        scans) that `render` would only decode and resample at `size`. None if the page
+        has to be rendered
+        """
+        return None
+
     def render_preview(self, page: int) -> Pixmap:
         return b""
 
     def get_text(self, page: int) -> str:
         return ""
 
+    def native_size(self, page: int) -> Size | None:
+        """
+        The size in pixels the page has all of its detail at, for pages made of a single
+        raster image like scans. Rendering larger than this only upscales the image. None
+        for pages without such a limit
+        """
+        return None
+
+    def is_vector(self, page: int) -> bool:
+        """
+        Whether the page can be placed or copied as vector content using `show_page` or
+        `copy_page`
+        """
+        return False
+
+    def show_page(self, page: int, target: Page, rect: Rect, rotate: int = 0) -> None:
+        """
+        Place the page as vector content fitted within `rect` of the `target` page, only
+        for pages that are `is_vector`
+        """
+        raise TypeError(f"page {page} can't be placed as vector content")
+
+    def copy_page(self, page: int, target: Document) -> None:
+        """
+        Copy the page as is to the end of the `target` document, only for pages that
+        are `is_vector`
+        """
+        raise TypeError(f"page {page} can't be placed as vector content")
+
+    def copy_pages(self, pages: Iterable[int], target: Document) -> None:
+        """
+        Copy the given pages in order to the end of the `target` document. Renderers
+        override this to share the resources of the pages (like fonts) within a batch
+        and release their documents afterwards.
+        """
+        for x in pages:
+            self.copy_page(x, target)
+
     def __len__(self) -> int:
         """
         Page count
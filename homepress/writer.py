@@ -0,0 +1,154 @@
+"""
+Incremental pdf output, to write large documents without holding them in memory
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from typing import BinaryIO
+
+import pymupdf
+
+
+def _object_digest(
+    doc: pymupdf.Document, xref: int, digests: dict[int, bytes]
+) -> bytes:
+    """
+    A digest of object `xref`, its stream and the objects it references, so that the
+    digests of identical objects match in different documents. `digests` holds the
+    digests of the objects of `doc` computed before
+    """
+    if xref not in digests:
+        digests[xref] = b""  # References back to the object aren't followed
+        digest = hashlib.sha1(
+            re.sub(
+                r"(\d+) \d+ R",
+                lambda x: _object_digest(doc, int(x[1]), digests).hex(),
+                doc.xref_object(xref, compressed=True),
+            ).encode()
+        )
+        if doc.xref_is_stream(xref):
+            digest.update(doc.xref_stream_raw(xref))
+        digests[xref] = digest.digest()
+    return digests[xref]
+
+
+def _xobjects(doc: pymupdf.Document, xref: int) -> tuple[int, str] | None:
+    """
+    The object holding the XObject resources of the page or form `xref`, and the path
+    of the resources within it. None if they are inherited from the page tree
+    """
+    owner, path = xref, ""
+    for key in ["Resources", "XObject"]:
+        kind, value = doc.xref_get_key(owner, path + key)
+        if kind == "xref":
+            owner, path = int(value.split()[0]), ""
+        elif kind == "dict":
+            path += key + "/"
+        else:
+            return None
+    return owner, path
+
+
+class PDFWriter:
+    """
+    Builds a pdf by appending documents to it. Every appended document is flushed to
+    a temporary file with an incremental save, so memory use is bounded by the largest
+    appended document instead of the whole output. The temporary file is moved or
+    copied to `output` on `close`.
+
+    Images identical to an image of a previously appended document are stored once,
+    the appended pages use the image already in the output.
+
+    ```python
+    with PDFWriter("output.pdf") as writer:
+        for x in parts:
+            writer.append(x)
+    ```
+    """
+
+    def __init__(self, output: str | Path | BinaryIO) -> None:
+        self.output = output
+        self._tempdir = tempfile.TemporaryDirectory(prefix="homepress_")
+        self.path = Path(self._tempdir.name) / "output.pdf"
+        self.page_count = 0
+        # The images in the output by their digest, see `_object_digest`
+        self._images: dict[bytes, int] = {}
+
+    def append(self, document: pymupdf.Document) -> None:
+        """
+        Append all the pages of `document` to the end of the output
+        """
+        if self.page_count == 0:
+            document.ez_save(self.path)
+            with pymupdf.open(self.path) as doc:
+                self._share_images(doc, 0)
+                if doc.is_dirty:
+                    doc.saveIncr()
+        else:
+            with pymupdf.open(self.path) as doc:
+                doc.insert_pdf(document)
+                self._share_images(doc, self.page_count)
+                doc.saveIncr()
+        self.page_count += document.page_count
+
+    def _share_images(self, doc: pymupdf.Document, start: int) -> None:
+        """
+        Makes the pages of `doc` from `start` on use the images already in the output
+        instead of identical copies, the copies are removed before they are saved
+        """
+        digests = {}
+        shared = {}  # The images of the pages and the image in the output they match
+        kept = set()  # Copies still used by a page
+        for page in doc.pages(start):
+            for xref, *_, name, _, referencer in page.get_images(full=True):
+                if xref not in shared:
+                    digest = _object_digest(doc, xref, digests)
+                    shared[xref] = self._images.setdefault(digest, xref)
+                if shared[xref] == xref:
+                    continue
+
+                if (xobjects := _xobjects(doc, referencer or page.xref)) is None:
+                    kept.add(xref)
+                else:
+                    owner, path = xobjects
+                    doc.xref_set_key(owner, path + name, f"{shared[xref]} 0 R")
+
+        for xref, used in shared.items():
+            if used != xref and xref not in kept:
+                doc.update_object(xref, "null")
+
+    def close(self) -> None:
+        """
+        Writes the output and removes the temporary files
+        """
+        try:
+            if self.page_count == 0:
+                # Raises the same error as saving an empty document would
+                pymupdf.Document().ez_save(self.path)
+
+            if isinstance(self.output, (str, os.PathLike)):
+                shutil.move(self.path, self.output)
+            else:
+                with open(self.path, "rb") as fp:
+                    shutil.copyfileobj(fp, self.output)
+        finally:
+            self._tempdir.cleanup()
+
+    def discard(self) -> None:
+        """
+        Removes the temporary files without writing the output
+        """
+        self._tempdir.cleanup()
+
+    def __enter__(self) -> "PDFWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
@@ -7,6 +7,7 @@ import time
 from io import BytesIO
 from pathlib import Path
 
+import pymupdf
 import requests
 import tqdm
 from dotenv import load_dotenv
@@ -79,6 +80,17 @@ else:
     datefile.write_text(str(int(time.time())), "utf-8")
 
 
+def text_pdf(path, pages: int, first: int = 0) -> None:
+    """
+    Writes a pdf of only text without any images, its pages read "Page <number>"
+    counting from `first`
+    """
+    with pymupdf.open() as doc:
+        for x in range(first, first + pages):
+            doc.new_page(width=200, height=300).insert_text((20, 40), f"Page {x}")
+        doc.save(str(path))
+
+
 def _batched(iter, batch_size):
     batch = []
     for x in iter:
@@ -0,0 +1,86 @@
+import pickle
+
+import pymupdf
+import pytest
+
+from homepress.renderer import CachedRenderer, Renderer
+
+
+class CountingRenderer(Renderer):
+    def __init__(self):
+        self.renders = 0
+        self.batches = []
+
+    def __len__(self):
+        return 10
+
+    def render(self, page, size, colorspace="rgb"):
+        self.renders += 1
+        return pymupdf.Pixmap(pymupdf.csRGB, pymupdf.IRect(0, 0, *map(int, size)))
+
+    def render_many(self, pages, size, colorspace="rgb"):
+        self.batches.append(list(pages))
+        return super().render_many(self.batches[-1], size, colorspace)
+
+    def render_preview(self, page):
+        return self.render(page, (42, 42))
+
+
+@pytest.fixture
+def counting_renderer():
+    return CountingRenderer()
+
+
+def test_cached_renderer_hit(counting_renderer: CountingRenderer):
+    renderer = CachedRenderer(counting_renderer, 10**6)
+    a = renderer.render(1, (10, 10))
+    b = renderer.render(1, (10, 10))
+    assert a is b
+    assert counting_renderer.renders == 1
+
+    renderer.render(1, (20, 20))
+    renderer.render_preview(1)
+    renderer.render_preview(1)
+    assert counting_renderer.renders == 3
+
+
+def test_cached_renderer_render_many(counting_renderer: CountingRenderer):
+    renderer = CachedRenderer(counting_renderer, 10**6)
+    a = renderer.render(2, (10, 10))
+    pixmaps = list(renderer.render_many([1, 2, 3], (10, 10)))
+    assert pixmaps[1] is a
+    assert counting_renderer.batches == [[1, 3]]
+    assert list(renderer.render_many([3, 1], (10, 10))) == [pixmaps[2], pixmaps[0]]
+    assert counting_renderer.batches == [[1, 3], []]
+
+
+def test_cached_renderer_eviction(counting_renderer: CountingRenderer):
+    # Room for exactly two 10x10 rgb pixmaps
+    renderer = CachedRenderer(counting_renderer, 2 * 10 * 10 * 3)
+    renderer.render(0, (10, 10))
+    renderer.render(1, (10, 10))
+    renderer.render(0, (10, 10))  # 0 is now the most recently used
+    renderer.render(2, (10, 10))  # evicts 1
+    assert counting_renderer.renders == 3
+    assert renderer.cached_bytes <= renderer.max_bytes
+
+    renderer.render(0, (10, 10))
+    assert counting_renderer.renders == 3
+    renderer.render(1, (10, 10))
+    assert counting_renderer.renders == 4
+
+
+def test_cached_renderer_too_large(counting_renderer: CountingRenderer):
+    renderer = CachedRenderer(counting_renderer, 10)
+    renderer.render(0, (10, 10))
+    renderer.render(0, (10, 10))
+    assert counting_renderer.renders == 2
+    assert renderer.cached_bytes == 0
+
+
+def test_cached_renderer_pickle(counting_renderer: CountingRenderer):
+    renderer = CachedRenderer(counting_renderer, 10**6)
+    renderer.render(0, (10, 10))
+    renderer = pickle.loads(pickle.dumps(renderer))
+    assert renderer.cached_bytes == 0
+    assert len(renderer) == 10
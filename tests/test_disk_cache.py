@@ -0,0 +1,86 @@
+import os
+from pathlib import Path
+
+import data
+import pymupdf
+import pytest
+
+from homepress.renderer import DiskCache
+from homepress.renderer.mupdf_renderer import MuPDFRenderer
+from homepress.renderer.pil_renderer import PILRenderer
+
+
+def _pixmap(w, h):
+    pixmap = pymupdf.Pixmap(pymupdf.csRGB, pymupdf.IRect(0, 0, w, h))
+    pixmap.set_rect(pixmap.irect, (120, 30, 200))
+    return pixmap
+
+
+class CountingDiskCache(DiskCache):
+    hits = 0
+
+    def get(self, key):
+        pixmap = super().get(key)
+        if pixmap is not None:
+            self.hits += 1
+        return pixmap
+
+
+def _files(cache: DiskCache):
+    return list(Path(cache.directory).glob("*/*.png"))
+
+
+def test_disk_cache_roundtrip(tmpdir: Path):
+    cache = DiskCache(tmpdir)
+    key = cache.key(data.root / "data.py", 0, 10, 10)
+    assert cache.get(key) is None
+
+    cache.put(key, _pixmap(10, 10))
+    pixmap = cache.get(key)
+    assert (pixmap.width, pixmap.height) == (10, 10)
+    assert pixmap.samples == _pixmap(10, 10).samples
+
+
+def test_disk_cache_key_changes_with_file(tmpdir: Path):
+    cache = DiskCache(tmpdir / "cache")
+    file = tmpdir / "input.txt"
+    file.write_text("a", "utf-8")
+    key = cache.key(file, 0)
+    assert key == cache.key(file, 0)
+    assert key != cache.key(file, 1)
+
+    file.write_text("ab", "utf-8")
+    assert key != cache.key(file, 0)
+
+
+def test_disk_cache_eviction(tmpdir: Path):
+    entry_size = len(_pixmap(64, 64).tobytes("png"))
+    cache = DiskCache(tmpdir, max_bytes=entry_size * 3)
+    keys = [cache.key(data.root / "data.py", x) for x in range(5)]
+    for i, x in enumerate(keys):
+        cache.put(x, _pixmap(64, 64))
+        os.utime(cache._path(x), ns=(i * 10**9, i * 10**9))
+
+    assert sum(x.stat().st_size for x in _files(cache)) <= entry_size * 3
+    # The most recent entry is always kept, the oldest are removed
+    assert cache.get(keys[-1]) is not None
+    assert cache.get(keys[0]) is None
+
+
+@pytest.mark.parametrize(
+    "renderer,extensions",
+    [
+        (MuPDFRenderer, ["pdf"]),
+        (PILRenderer, ["jpg", "png"]),
+    ],
+)
+def test_renderer_uses_disk_cache(tmpdir: Path, renderer, extensions):
+    cache = CountingDiskCache(tmpdir)
+    file = next(data.dataset.filter_extension(extensions))
+    a = renderer(file, cache=cache).render(0, (64, 64))
+    assert len(_files(cache)) == 1
+    assert cache.hits == 0
+
+    b = renderer(file, cache=cache).render(0, (64, 64))
+    assert cache.hits == 1
+    assert (a.width, a.height) == (b.width, b.height)
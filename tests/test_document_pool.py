@@ -0,0 +1,144 @@
+import os
+import pickle
+import threading
+
+import data
+import pymupdf
+import pytest
+
+from homepress import Press
+from homepress.progress import Progress
+from homepress.renderer import DocumentPool, get_renderer
+
+
+def _opener(file):
+    return lambda: pymupdf.open(file)
+
+
+@pytest.fixture(scope="module")
+def pdfs():
+    return list(data.dataset.filter_extension(["pdf"]))[:3]
+
+
+def test_document_pool_reuses_documents(pdfs):
+    pool = DocumentPool(2)
+    with pool.lease(pdfs[0], _opener(pdfs[0])) as doc:
+        pass
+    with pool.lease(pdfs[0], _opener(pdfs[0])) as doc2:
+        assert doc2 is doc
+    assert not doc.is_closed
+
+
+def test_document_pool_eviction(pdfs):
+    pool = DocumentPool(2)
+    docs = []
+    for x in pdfs:
+        with pool.lease(x, _opener(x)) as doc:
+            docs.append(doc)
+    assert len(pool) == 2
+    # The least recently used document is closed first
+    assert docs[0].is_closed
+    assert not docs[1].is_closed and not docs[2].is_closed
+
+    # and opened again when it's needed
+    with pool.lease(pdfs[0], _opener(pdfs[0])) as doc:
+        assert not doc.is_closed
+        assert doc.page_count > 0
+    assert docs[1].is_closed
+
+
+def test_document_pool_keeps_leased_documents(pdfs):
+    pool = DocumentPool(1)
+    with pool.lease(pdfs[0], _opener(pdfs[0])) as first:
+        with pool.lease(pdfs[1], _opener(pdfs[1])):
+            pass
+        assert not first.is_closed
+        assert first.page_count > 0
+    assert len(pool) == 1
+
+
+def test_document_pool_pickle(pdfs):
+    pool = DocumentPool(3)
+    with pool.lease(pdfs[0], _opener(pdfs[0])):
+        pass
+    pool2 = pickle.loads(pickle.dumps(pool))
+    assert pool2.max_open == 3
+    assert len(pool2) == 0
+
+
+def test_document_pool_invalid():
+    with pytest.raises(ValueError):
+        DocumentPool(0)
+
+
+def test_renderers_share_pool(pdfs):
+    pool = DocumentPool(1)
+    renderer = get_renderer(pdfs, pool=pool)
+    for i in range(len(renderer)):
+        renderer.render(i, (50, 50))
+        assert len(pool) <= 1
+    assert all(x.pool is pool for x in renderer.renderers)
+
+
+def test_document_pool_exclusive_lease(pdfs):
+    pool = DocumentPool(2)
+    leased = threading.Event()
+    release = threading.Event()
+    order = []
+
+    def hold():
+        with pool.lease(pdfs[0], _opener(pdfs[0])):
+            leased.set()
+            release.wait()
+            order.append("first")
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    leased.wait()
+    # Other threads wait for the lease to be returned
+    timer = threading.Timer(0.1, release.set)
+    timer.start()
+    with pool.lease(pdfs[0], _opener(pdfs[0])):
+        order.append("second")
+    thread.join()
+    assert order == ["first", "second"]
+
+
+def test_document_pool_release_grafts(tmpdir):
+    files = []
+    for x in range(6):
+        data.text_pdf(tmpdir / f"{x}.pdf", 1, x)
+        files.append(tmpdir / f"{x}.pdf")
+
+    pool = DocumentPool(2)
+    renderer = get_renderer(files, pool=pool)
+    shown, copied = pymupdf.open(), pymupdf.open()
+    page = shown.new_page()
+    for x in range(len(renderer)):
+        renderer.show_page(x, page, page.rect)
+        renderer.copy_page(x, copied)
+        # The graft maps of closed documents would keep them open
+        assert len(shown.Graftmaps) <= pool.max_open
+        assert len(copied.Graftmaps) <= pool.max_open
+    assert "Page 5" in page.get_text()
+    assert copied.page_count == len(renderer)
+
+
+@pytest.mark.skipif(
+    not os.path.isdir("/proc/self/fd"), reason="Counts the open file descriptors"
+)
+@pytest.mark.parametrize("function", ["progress_merge", "progress_midpage"])
+def test_press_vector_open_files(tmpdir, function):
+    for x in range(20):
+        data.text_pdf(tmpdir / f"{x}.pdf", 1, x)
+
+    press = Press([tmpdir], max_open_documents=2)
+    open_files = []
+    progress = Progress(
+        callback=lambda _: open_files.append(len(os.listdir("/proc/self/fd")))
+    )
+    before = len(os.listdir("/proc/self/fd"))
+    getattr(press, function)(
+        tmpdir / "output.pdf", vector=True, progress=progress
+    ).sync()
+    assert max(open_files) - before <= 4
@@ -4,7 +4,7 @@ import data
 import pytest
 
 import homepress.renderer
-from homepress.renderer import get_renderer
+from homepress.renderer import DocumentPool, get_renderer
 
 # Uncomment this if u wish to run the code
 # at test_get_renderer_files_unsupported_with_ignore_errors
@@ -59,3 +59,30 @@ def test_get_renderer_files_unsupported_with_ignore_errors():
 
 def test_get_renderer_files_folder():
     assert len(get_renderer([data.root / "testdata" / "filesamples.com"])) != 0
+
+
+def test_get_renderer_folder_order(tmp_path):
+    names = ["10.png", "2.png", "a/1.png", "a/b/0.png", "b 2.png", "b 10.png"]
+    for x in names:
+        (tmp_path / x).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / x).touch()  # Image files aren't opened to build the renderer
+
+    renderer = get_renderer([tmp_path])
+    assert len(renderer) == len(names)
+    assert [x.file.relative_to(tmp_path).as_posix() for x in renderer.renderers] == [
+        "2.png",
+        "10.png",
+        "a/1.png",
+        "a/b/0.png",
+        "b 2.png",
+        "b 10.png",
+    ]
+
+
+def test_get_renderer_counts_lazily():
+    pool = DocumentPool(2)
+    renderer = get_renderer(list(data.dataset.filter_extension(["pdf"])), pool=pool)
+    assert "offsets" not in vars(renderer)
+    assert len(renderer) > 0
+    # Counting pages doesn't keep all the documents open
+    assert len(pool) <= 2
@@ -24,3 +24,57 @@ def test_multi_renderer_preview(multi_renderer: MultiRenderer):
 
 def test_multi_renderer_get_text(multi_renderer: MultiRenderer):
     assert TestRenderer().get_text(0) == multi_renderer.get_text(1)
+
+
+def test_multi_renderer_is_vector(multi_renderer: MultiRenderer):
+    assert not multi_renderer.is_vector(3)
+
+
+def test_multi_renderer_localise():
+    renderers = [TestRenderer(len=x) for x in (3, 0, 2, 4)]
+    multi_renderer = MultiRenderer(renderers)
+    assert len(multi_renderer) == 9
+    assert multi_renderer._localise_pageno(3) == (renderers[2], 0)
+    assert multi_renderer._localise_pageno(8) == (renderers[3], 3)
+    assert multi_renderer.localise([0, 1, 4, 5, 6, 2]) == [
+        (renderers[0], [0, 1]),
+        (renderers[2], [1]),
+        (renderers[3], [0, 1]),
+        (renderers[0], [2]),
+    ]
+
+    for x in (-1, 9):
+        with pytest.raises(IndexError):
+            multi_renderer.localise([0, x])
+
+
+def test_multi_renderer_render_many():
+    multi_renderer = MultiRenderer(
+        [TestRenderer(len=2, render_res=x) for x in range(3)]
+    )
+    assert list(multi_renderer.render_many([0, 3, 4, 5, 1], (10, 10))) == [
+        0,
+        1,
+        2,
+        2,
+        0,
+    ]
+
+
+def test_multi_renderer_not_vector():
+    multi_renderer = MultiRenderer([TestRenderer(len=2) for _ in range(2)])
+    assert not multi_renderer.is_vector(3)
+    with pytest.raises(TypeError):
+        multi_renderer.copy_page(3, None)
+
+
+def test_multi_renderer_copy_pages():
+    copied = []
+
+    class CopyingRenderer(TestRenderer):
+        def copy_pages(self, pages, target):
+            copied.append((self, list(pages)))
+
+    a, b = CopyingRenderer(len=2), CopyingRenderer(len=2)
+    MultiRenderer([a, b]).copy_pages([0, 1, 2, 3, 0], None)
+    assert copied == [(a, [0, 1]), (b, [0, 1]), (a, [0])]
@@ -2,7 +2,7 @@ import pytest
 from test_renderer import TestRenderer
 
 from homepress.renderer import MultiRenderer
-from homepress.renderer.page_range_renderer import PageRangeRenderer
+from homepress.renderer.page_range_renderer import PageRangeRenderer, PageRanges
 
 
 @pytest.fixture(scope="module")
@@ -31,3 +31,56 @@ def test_page_renderer_get_text(page_renderer: PageRangeRenderer):
 
 def test_page_renderer_len(page_renderer: PageRangeRenderer):
     assert 6 == len(page_renderer)
+
+
+def test_page_ranges():
+    pages = PageRanges(1, 2, range(3, 6), [9, range(20, 10, -3)], PageRanges(7))
+    assert pages.ranges == [range(1, 6), range(9, 10), range(20, 10, -3), range(7, 8)]
+    assert list(pages) == [1, 2, 3, 4, 5, 9, 20, 17, 14, 11, 7]
+    assert [pages[x] for x in range(-len(pages), len(pages))] == list(pages) * 2
+    assert pages.bounds() == (1, 20)
+    assert 17 in pages and 18 not in pages
+    with pytest.raises(IndexError):
+        pages[len(pages)]
+
+
+def test_page_ranges_parse():
+    assert PageRanges.parse("1,4,6-10,12") == PageRanges(1, 4, range(6, 10), 12)
+    with pytest.raises(ValueError):
+        PageRanges.parse("1,a")
+
+
+def test_page_ranges_select():
+    pages = PageRanges(range(10, 20), range(30, 40), 50)
+    selected = pages.select(PageRanges(range(5, 16), [20, 0], range(20, 15, -2)))
+    assert selected.ranges == [
+        range(15, 20),
+        range(30, 36),
+        range(50, 51),
+        range(10, 11),
+        range(50, 51),
+        range(38, 39),
+        range(36, 37),
+    ]
+    with pytest.raises(IndexError):
+        pages.select(PageRanges(21))
+
+
+def test_page_renderer_large_range():
+    renderer = TestRenderer(len=10**9)
+    page_renderer = PageRangeRenderer(renderer, range(10**9))
+    assert len(page_renderer.pages.ranges) == 1
+    with pytest.raises(IndexError):
+        PageRangeRenderer(renderer, 0, range(10, 10**9 + 1))
+
+
+def test_page_renderer_nested():
+    renderer = MultiRenderer([TestRenderer(render_res=x) for x in range(10)])
+    nested = PageRangeRenderer(PageRangeRenderer(renderer, range(2, 8), 9), range(4, 7))
+    assert nested.renderer is renderer
+    assert list(nested.pages) == [6, 7, 9]
+    assert nested.render(2, (10, 10)) == 9
+
+
+def test_page_renderer_render_many(page_renderer: PageRangeRenderer):
+    assert list(page_renderer.render_many([5, 0, 1], (10, 10))) == [7, 2, 3]
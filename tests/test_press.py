@@ -1,11 +1,16 @@
 import logging
+import multiprocessing
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 
 import data
+import PIL.Image
+import pymupdf
 import pytest
 
 import homepress.renderer
-from homepress import Press
+from homepress import Press, parallel
 
 
 @pytest.fixture(
@@ -98,3 +103,370 @@ def test_midpage_multi(
         stack_prefix=stack_prefix,
         stack_size=stack_size,
     )
+
+
+def _image_streams(file: Path) -> list[list[bytes]]:
+    """
+    The raw streams of the images of every page of a pdf
+    """
+    with pymupdf.open(str(file)) as doc:
+        return [
+            [doc.xref_stream_raw(x[0]) for x in page.get_images(full=True)]
+            for page in doc
+        ]
+
+
+def _image_sizes(file: Path) -> list[list[tuple]]:
+    """
+    The size and placement of the images of every page of a pdf
+    """
+    with pymupdf.open(str(file)) as doc:
+        return [
+            [(x["width"], x["height"], x["bbox"]) for x in page.get_image_info()]
+            for page in doc
+        ]
+
+
+def test_merge_workers(press_10: Press, tmpdir: Path):
+    press_10.merge(tmpdir / "merge_test.pdf", resolution=(64, 64), workers=2)
+    press_10.merge(tmpdir / "merge_single.pdf", resolution=(64, 64))
+    assert _image_streams(tmpdir / "merge_test.pdf") == _image_streams(
+        tmpdir / "merge_single.pdf"
+    )
+
+
+def test_midpage_workers(press_10: Press, tmpdir: Path):
+    press_10.midpage(tmpdir / "midpage_test.pdf", size="A4", ppi=10, workers=2)
+    press_10.midpage(tmpdir / "midpage_single.pdf", size="A4", ppi=10)
+    # MuPDF resamples the images of some inputs (like mobi) slightly differently
+    # depending on the pages the process rendered before, and the workers render the
+    # pages in booklet order, so only the placed images are compared
+    assert _image_sizes(tmpdir / "midpage_test.pdf") == _image_sizes(
+        tmpdir / "midpage_single.pdf"
+    )
+
+
+def test_press_images_workers(press_10: Press, tmpdir: Path):
+    press_10.images(tmpdir / "workers", format="png", resolution=(64, 64), workers=2)
+    press_10.images(tmpdir / "single", format="png", resolution=(64, 64))
+    files = sorted(x.name for x in Path(tmpdir / "single").iterdir())
+    assert len(files) == len(press_10.renderer)
+    assert sorted(x.name for x in Path(tmpdir / "workers").iterdir()) == files
+    for x in files:
+        assert (tmpdir / "workers" / x).read_binary() == (
+            tmpdir / "single" / x
+        ).read_binary()
+
+
+def test_render_encoded_threads(press_10: Press):
+    pages = range(min(len(press_10.renderer), 4))
+    images = list(parallel.render_encoded(press_10.renderer, pages, (64, 64)))
+    assert [
+        x.data
+        for x in parallel.render_encoded(press_10.renderer, pages, (64, 64), threads=1)
+    ] == [x.data for x in images]
+
+
+def test_worker_result_main_guard():
+    future = Future()
+    future.set_exception(BrokenProcessPool("terminated abruptly"))
+    with pytest.raises(BrokenProcessPool, match="__main__"):
+        parallel.worker_result(future)
+
+
+@pytest.mark.parametrize("rtl", [False, True])
+def test_midpage_vector(press_10: Press, tmpdir: Path, rtl):
+    press_10.midpage(
+        tmpdir / "midpage_test.pdf",
+        size="A4",
+        margin=[4, 3],
+        ppi=10,
+        rtl=rtl,
+        vector=True,
+    )
+    renderer = press_10.renderer
+    with pymupdf.open(str(tmpdir / "midpage_test.pdf")) as doc:
+        text = "".join(page.get_text() for page in doc)
+    if any(
+        renderer.is_vector(x) and renderer.get_text(x).strip()
+        for x in range(len(renderer))
+    ):
+        assert text.strip()
+
+
+@pytest.mark.parametrize("rtl", [False, True])
+def test_midpage_vector_content(tmpdir: Path, rtl):
+    data.text_pdf(tmpdir / "text.pdf", 8)
+    Press([tmpdir / "text.pdf"]).midpage(
+        tmpdir / "midpage_test.pdf", ppi=10, rtl=rtl, vector=True
+    )
+    with pymupdf.open(str(tmpdir / "midpage_test.pdf")) as doc:
+        text = ""
+        for page in doc:
+            # Placed as vector content instead of rendered images
+            assert page.get_images() == []
+            text += page.get_text()
+    assert text.split().count("Page") == 8
+    assert {str(x) for x in range(8)} <= set(text.split())
+
+
+def test_merge_vector(press_10: Press, tmpdir: Path):
+    press_10.merge(tmpdir / "merge_test.pdf", resolution=(64, 64), vector=True)
+    renderer = press_10.renderer
+    with pymupdf.open(str(tmpdir / "merge_test.pdf")) as doc:
+        assert doc.page_count == len(renderer)
+        for x in range(len(renderer)):
+            if renderer.is_vector(x) and renderer.get_text(x).strip():
+                assert doc[x].get_text().strip()
+
+
+def test_merge_vector_content(tmpdir: Path):
+    data.text_pdf(tmpdir / "text.pdf", 3)
+    Press([tmpdir / "text.pdf"]).merge(tmpdir / "merge_test.pdf", vector=True)
+    with pymupdf.open(str(tmpdir / "merge_test.pdf")) as doc:
+        assert doc.page_count == 3
+        for x, page in enumerate(doc):
+            assert page.get_images() == []
+            assert page.get_text().strip() == f"Page {x}"
+
+
+@pytest.mark.parametrize("separate_stacks", [False, True])
+def test_midpage_multi_workers(press_30: Press, tmpdir: Path, separate_stacks):
+    outputs = {}
+    for workers in [2, 1]:
+        output = Path(tmpdir / f"workers_{workers}" / "midpage_test.pdf")
+        output.parent.mkdir()
+        progress = press_30.progress_midpage_multi(
+            output,
+            ppi=10,
+            separate_stacks=separate_stacks,
+            stack_size=4,
+            workers=workers,
+        )
+        progress.sync()
+        files = sorted(output.iterdir()) if separate_stacks else [output]
+        outputs[workers] = (
+            [x.name for x in files],
+            [_image_sizes(x) for x in files],
+            progress.metrics["ppi"],
+        )
+
+    # Same stacks with the same pages in the same order, see `test_midpage_workers`
+    assert outputs[2] == outputs[1]
+
+
+def test_press_cache(tmpdir: Path):
+    press = Press(
+        list(data.dataset.filter_extension(["pdf"]))[:2], cache_bytes=64 * 2**20
+    )
+    press.midpage(tmpdir / "midpage_test.pdf", ppi=10)
+    press.midpage(tmpdir / "midpage_test.pdf", ppi=10, rtl=True)
+    assert press.renderer.cached_bytes > 0
+
+
+@pytest.mark.parametrize("colorspace", ["gray", "mono"])
+def test_press_colorspace(press_10: Press, tmpdir: Path, colorspace):
+    press_10.merge(
+        tmpdir / "merge_test.pdf", resolution=(64, 64), colorspace=colorspace
+    )
+    press_10.midpage(tmpdir / "midpage_test.pdf", ppi=10, colorspace=colorspace)
+    press_10.images(tmpdir, resolution=(64, 64), colorspace=colorspace)
+
+    with pymupdf.open(str(tmpdir / "merge_test.pdf")) as doc:
+        for x in doc[0].get_image_info():
+            assert x["colorspace"] == 1
+            assert x["bpc"] == (1 if colorspace == "mono" else 8)
+
+    with pytest.raises(ValueError):
+        press_10.merge(tmpdir / "merge_test.pdf", colorspace="cmyk")
+
+
+@pytest.mark.parametrize(
+    "encoding,filter",
+    [("flate", "FlateDecode"), ("jpeg", "DCTDecode"), ("jpx", "JPXDecode")],
+)
+def test_press_encoding(press_10: Press, tmpdir: Path, encoding, filter):
+    press_10.merge(tmpdir / "merge_test.pdf", resolution=(64, 64), encoding=encoding)
+    press_10.midpage(tmpdir / "midpage_test.pdf", ppi=10, encoding=encoding, quality=50)
+
+    for x in ["merge_test.pdf", "midpage_test.pdf"]:
+        with pymupdf.open(str(tmpdir / x)) as doc:
+            for image in doc[0].get_images(full=True):
+                assert image[8] == filter
+                assert doc.extract_image(image[0])["width"] == image[2]
+
+    with pytest.raises(ValueError):
+        press_10.merge(tmpdir / "merge_test.pdf", encoding="png")
+    with pytest.raises(ValueError):
+        press_10.merge(tmpdir / "merge_test.pdf", encoding="jpeg", quality=0)
+
+
+def test_press_encoding_workers(press_10: Press, tmpdir: Path):
+    press_10.merge(
+        tmpdir / "merge_test.pdf", resolution=(64, 64), workers=2, encoding="jpeg"
+    )
+    with pymupdf.open(str(tmpdir / "merge_test.pdf")) as doc:
+        assert doc[0].get_images(full=True)[0][8] == "DCTDecode"
+
+
+@pytest.mark.parametrize("flip_even", [True, False])
+def test_midpage_flush_every(press_10: Press, tmpdir: Path, flip_even):
+    press_10.midpage(tmpdir / "midpage_test.pdf", ppi=10, flip_even=flip_even)
+    press_10.midpage(
+        tmpdir / "midpage_flush_test.pdf", ppi=10, flip_even=flip_even, flush_every=3
+    )
+
+    with (
+        pymupdf.open(str(tmpdir / "midpage_test.pdf")) as expected,
+        pymupdf.open(str(tmpdir / "midpage_flush_test.pdf")) as doc,
+    ):
+        assert doc.page_count == expected.page_count
+        for x, y in zip(doc, expected):
+            assert x.rotation == y.rotation
+            assert len(x.get_images()) == len(y.get_images())
+
+    with pytest.raises(ValueError):
+        press_10.midpage(tmpdir / "midpage_test.pdf", flush_every=-1)
+
+
+def test_press_dedup(tmpdir: Path):
+    press = Press(
+        list(data.dataset.filter_extension(["pdf"]))[:1], pages=[0, 1, 0, 0, 1, 0, 2, 0]
+    )
+    press.merge(tmpdir / "merge_test.pdf", resolution=(64, 64))
+    press.midpage(tmpdir / "midpage_test.pdf", ppi=10)
+    # Shared between the separately written stacks and chunks
+    press.midpage_multi(tmpdir / "midpage_multi_test.pdf", ppi=10, stack_size=4)
+    press.midpage(tmpdir / "midpage_flush_test.pdf", ppi=10, flush_every=1)
+
+    outputs = ["merge_test", "midpage_test", "midpage_multi_test", "midpage_flush_test"]
+    for x in [f"{x}.pdf" for x in outputs]:
+        with pymupdf.open(str(tmpdir / x)) as doc:
+            xrefs = {y[0] for page in doc for y in page.get_images()}
+            assert len(xrefs) == 3
+
+
+def test_press_max_upscale(tmpdir: Path):
+    image = pymupdf.Pixmap(pymupdf.csRGB, pymupdf.IRect(0, 0, 100, 150), False)
+    image.clear_with(255)
+    doc = pymupdf.Document()
+    for _ in range(4):
+        page = doc.new_page(width=300, height=450)
+        page.insert_image(page.rect, pixmap=image)
+    doc.save(str(tmpdir / "scan.pdf"))
+    press = Press([tmpdir / "scan.pdf"])
+
+    press.merge(tmpdir / "merge_test.pdf", resolution=(1000, 1000), max_upscale=2)
+    with pymupdf.open(str(tmpdir / "merge_test.pdf")) as doc:
+        assert doc[0].get_images()[0][2:4] == (200, 300)
+
+    progress = press.progress_merge(tmpdir / "merge_test.pdf", max_upscale=1)
+    progress.sync()
+    assert progress.metrics["resolution"] == {x: (100, 150) for x in range(4)}
+
+    # 200 ppi would need a larger image than the scan
+    progress = press.progress_midpage(tmpdir / "midpage_test.pdf", max_upscale=1)
+    progress.sync()
+    assert all(x < 100 for x in progress.metrics["ppi"].values())
+    progress = press.progress_midpage(tmpdir / "midpage_test.pdf", ppi=10)
+    progress.sync()
+    assert all(x == pytest.approx(10, 0.1) for x in progress.metrics["ppi"].values())
+
+    progress = press.progress_midpage_multi(
+        tmpdir / "midpage_test.pdf", ppi=10, stack_size=4, max_upscale=1
+    )
+    progress.sync()
+    assert sorted(progress.metrics["ppi"]) == list(range(4))
+
+    with pytest.raises(ValueError):
+        press.merge(tmpdir / "merge_test.pdf", max_upscale=0)
+
+
+def test_press_scan_passthrough(tmpdir: Path):
+    image = pymupdf.Pixmap(pymupdf.csRGB, pymupdf.IRect(0, 0, 100, 150), False)
+    image.clear_with(128)
+    jpeg = image.tobytes("jpeg")
+    doc = pymupdf.Document()
+    for _ in range(4):
+        page = doc.new_page(width=300, height=450)
+        page.insert_image(page.rect, stream=jpeg)
+    doc.save(str(tmpdir / "scan.pdf"))
+    press = Press([tmpdir / "scan.pdf"])
+
+    press.merge(tmpdir / "merge_test.pdf", resolution=(1000, 1000))
+    press.midpage(tmpdir / "midpage_test.pdf", workers=2)
+    for x in ["merge_test.pdf", "midpage_test.pdf"]:
+        with pymupdf.open(str(tmpdir / x)) as doc:
+            for page in doc:
+                for image in page.get_images():
+                    assert doc.xref_stream_raw(image[0]) == jpeg
+
+
+def test_press_jpeg_passthrough(tmpdir: Path):
+    image = pymupdf.Pixmap(pymupdf.csRGB, pymupdf.IRect(0, 0, 40, 20), False)
+    image.clear_with(128)
+    jpeg = image.tobytes("jpeg")
+    (tmpdir / "photo.jpg").write_binary(jpeg)
+    press = Press([tmpdir / "photo.jpg"] * 2)
+
+    press.merge(tmpdir / "merge_test.pdf", resolution=(100, 100))
+    press.midpage(tmpdir / "midpage_test.pdf", ppi=300)
+    for x in ["merge_test.pdf", "midpage_test.pdf"]:
+        with pymupdf.open(str(tmpdir / x)) as doc:
+            for page in doc:
+                for image in page.get_images():
+                    assert doc.xref_stream_raw(image[0]) == jpeg
+
+    with pymupdf.open(str(tmpdir / "merge_test.pdf")) as doc:
+        assert doc[0].rect == pymupdf.Rect(0, 0, 40, 20)
+
+
+def test_press_jpeg_orientation(tmpdir: Path):
+    im = PIL.Image.new("RGB", (40, 20), "white")
+    im.paste((255, 0, 0), (0, 0, 40, 8))  # Red top rows as stored
+    exif = PIL.Image.Exif()
+    exif[0x0112] = 6  # Rotated 90 degrees clockwise to show
+    im.save(tmpdir / "photo.jpg", exif=exif, quality=95)
+
+    # Passed through and rendered
+    for resolution in [(100, 100), (10, 10)]:
+        Press([tmpdir / "photo.jpg"]).merge(
+            tmpdir / "merge_test.pdf", resolution=resolution
+        )
+        with pymupdf.open(str(tmpdir / "merge_test.pdf")) as doc:
+            page = doc[0]
+            assert page.rect.width < page.rect.height
+            pixmap = page.get_pixmap()
+            assert pixmap.pixel(pixmap.width - 1, pixmap.height // 2)[1] < 64
+
+
+def test_press_concurrent_jobs(tmpdir: Path):
+    press = Press(list(data.dataset.filter_extension(["pdf"]))[:3])
+    text = press.text()
+
+    progresses = [
+        press.progress_midpage(tmpdir / "midpage_test.pdf", ppi=30, vector=True),
+        press.progress_merge(tmpdir / "merge_test.pdf", resolution=(100, 100)),
+        press.progress_text(),
+        press.progress_text(),
+    ]
+    results = [x.sync() for x in progresses]
+    assert results[2] == text and results[3] == text
+
+    with pymupdf.open(str(tmpdir / "merge_test.pdf")) as doc:
+        assert doc.page_count == len(press.renderer)
+
+
+@pytest.mark.parametrize("function", ["progress_midpage", "progress_merge"])
+def test_press_failure_stops_workers(
+    press_10: Press, tmpdir: Path, monkeypatch, function
+):
+    def fail(*args, **kwargs):
+        raise RuntimeError("insert failed")
+
+    monkeypatch.setattr(homepress.press, "insert_encoded", fail)
+    progress = getattr(press_10, function)(tmpdir / "output.pdf", workers=2)
+    progress.wait()
+    assert isinstance(progress.exception, RuntimeError)
+    # The worker processes are shut down even though the progress keeps the traceback
+    assert multiprocessing.active_children() == []
@@ -0,0 +1,80 @@
+import threading
+
+import pytest
+
+from homepress.progress import Progress, runs_with_progress
+
+
+@runs_with_progress
+def _job(n, event=None, *, progress: Progress = None):
+    progress.set_total(n)
+    if event is not None:
+        event.wait()
+    for _ in range(n):
+        progress.increment_progress()
+    return n
+
+
+@runs_with_progress
+def _failing_job(*, progress: Progress = None):
+    raise ValueError("failed")
+
+
+def test_progress_sync():
+    assert _job(5).sync() == 5
+
+
+def test_progress_wait():
+    event = threading.Event()
+    progress = _job(3, event)
+    assert not progress.wait(0.01)
+    event.set()
+    assert progress.wait(5)
+    assert progress.completed
+    assert progress.progress == 3
+
+
+def test_progress_fail():
+    progress = _failing_job()
+    assert progress.wait(5)
+    with pytest.raises(ValueError):
+        progress.check_fail()
+
+
+def test_progress_child():
+    parent = Progress(total=10)
+    child = parent.create_child()
+    _job(4, progress=child).sync()
+    assert child.progress == 4
+    assert parent.progress == 4
+
+    child = parent.create_child()
+    child.set_progress(3)
+    child.set_progress(2)
+    assert parent.progress == 6
+
+
+@pytest.mark.parametrize("callback_threading", [False, True])
+def test_progress_callback_coalesced(callback_threading):
+    calls = []
+    delivered = threading.Event()
+
+    def callback(progress: Progress):
+        calls.append(progress.progress)
+        if progress.progress == 10000:
+            delivered.set()
+
+    progress = Progress(
+        total=10000,
+        callback=callback,
+        callback_threading=callback_threading,
+        callback_interval=60,
+    )
+    for _ in range(10000):
+        progress.increment_progress()
+    progress.complete()
+
+    # The final update is always delivered
+    assert delivered.wait(5)
+    assert len(calls) <= 3
+    assert threading.active_count() < 10
@@ -19,7 +19,7 @@ class TestRenderer(Renderer):
     def __len__(self):
         return self.len
 
-    def render(self, page, res):
+    def render(self, page, res, colorspace="rgb"):
         return self.render_res
 
     def render_preview(self, page):
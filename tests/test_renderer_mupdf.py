@@ -1,6 +1,9 @@
+import io
 import logging
 
 import data
+import PIL.Image
+import pymupdf
 import pytest
 
 from homepress.renderer.mupdf_renderer import MuPDFRenderer
@@ -46,3 +49,143 @@ def test_file_exists():
         renderer = MuPDFRenderer(
             "asbsladoibibqwiogriobibhgioiovhaoivhgiovhgiovhari.pdf"
         )
+
+
+def test_show_page(mupdf_renderer: MuPDFRenderer):
+    doc = pymupdf.Document()
+    for x in range(len(mupdf_renderer)):
+        if mupdf_renderer.is_vector(x):
+            page = doc.new_page(width=100, height=100)
+            mupdf_renderer.show_page(x, page, pymupdf.Rect(10, 10, 90, 90), -90)
+            # Placed as vector content, so the text is kept
+            if mupdf_renderer.get_text(x).strip():
+                assert page.get_text().strip()
+
+
+def test_show_page_vector(tmpdir):
+    data.text_pdf(tmpdir / "text.pdf", 2)
+    renderer = MuPDFRenderer(tmpdir / "text.pdf")
+    doc = pymupdf.Document()
+    for x in range(len(renderer)):
+        assert renderer.is_vector(x)
+        page = doc.new_page(width=100, height=100)
+        renderer.show_page(x, page, pymupdf.Rect(10, 10, 90, 90), -90)
+        assert page.get_images() == []
+        assert page.get_text().strip() == f"Page {x}"
+
+
+def test_copy_page(mupdf_renderer: MuPDFRenderer):
+    doc = pymupdf.Document()
+    for x in range(len(mupdf_renderer)):
+        mupdf_renderer.copy_page(x, doc)
+    assert doc.page_count == len(mupdf_renderer)
+    for x in range(len(mupdf_renderer)):
+        if mupdf_renderer.get_text(x).strip():
+            assert doc[x].get_text().strip()
+
+
+def test_copy_page_vector(tmpdir):
+    data.text_pdf(tmpdir / "text.pdf", 2)
+    renderer = MuPDFRenderer(tmpdir / "text.pdf")
+    doc = pymupdf.Document()
+    for x in range(len(renderer)):
+        renderer.copy_page(x, doc)
+    assert doc.page_count == 2
+    for x in range(2):
+        assert doc[x].get_images() == []
+        assert doc[x].get_text().strip() == f"Page {x}"
+
+
+def test_copy_pages(tmpdir):
+    data.text_pdf(tmpdir / "text.pdf", 4)
+    renderer = MuPDFRenderer(tmpdir / "text.pdf")
+    doc = pymupdf.Document()
+    renderer.copy_pages([3, 1, 2], doc)
+    assert [x.get_text().strip() for x in doc] == ["Page 3", "Page 1", "Page 2"]
+    # The graft map keeping the input open is dropped after the batch
+    assert all(x is None for x in doc.Graftmaps.values())
+
+
+def test_render_many(mupdf_renderer: MuPDFRenderer):
+    pages = list(range(min(len(mupdf_renderer), 3))) * 2
+    for page, pixmap in zip(pages, mupdf_renderer.render_many(pages, (64, 64))):
+        assert pixmap.samples == mupdf_renderer.render(page, (64, 64)).samples
+
+
+@pytest.mark.parametrize("colorspace", ["gray", "mono"])
+def test_render_colorspace(mupdf_renderer: MuPDFRenderer, colorspace):
+    pixmap = mupdf_renderer.render(0, (64, 64), colorspace)
+    assert (pixmap.n, pixmap.alpha) == (1, 0)
+    if colorspace == "mono":
+        assert set(pixmap.samples) <= {0, 255}
+
+
+def test_native_size(tmp_path):
+    image = pymupdf.Pixmap(pymupdf.csRGB, pymupdf.IRect(0, 0, 300, 400), False)
+    image.clear_with(255)
+    doc = pymupdf.Document()
+    page = doc.new_page(width=600, height=800)  # A scan
+    page.insert_image(page.rect, pixmap=image)
+    page = doc.new_page(width=800, height=600)  # A rotated scan
+    page.insert_image(page.rect, pixmap=image, rotate=90)
+    page = doc.new_page(width=600, height=800)  # A small image with other content
+    page.insert_image(pymupdf.Rect(0, 0, 100, 100), pixmap=image)
+    page = doc.new_page(width=600, height=800)  # Text only
+    page.insert_text((10, 10), "text")
+    doc.save(tmp_path / "scan.pdf")
+
+    renderer = MuPDFRenderer(tmp_path / "scan.pdf")
+    assert renderer.native_size(0) == (300, 400)
+    assert renderer.native_size(1) == (400, 300)
+    assert renderer.native_size(2) is None
+    assert renderer.native_size(3) is None
+
+
+def test_extract_image(tmp_path):
+    image = io.BytesIO()
+    PIL.Image.radial_gradient("L").convert("RGB").save(image, "JPEG")
+    doc = pymupdf.Document()
+    for x in range(3):
+        page = doc.new_page(width=128, height=128)
+        page.insert_image(page.rect, stream=image.getvalue())
+    doc[1].insert_text((10, 10), "text")  # Visible content besides the image
+    doc[2].set_rotation(90)
+    doc.save(tmp_path / "scan.pdf")
+
+    renderer = MuPDFRenderer(tmp_path / "scan.pdf")
+    extracted = renderer.extract_image(0, (300, 300))
+    assert extracted.data == image.getvalue()
+    assert extracted[:5] == (256, 256, "DeviceRGB", 8, "DCTDecode")
+
+    assert renderer.extract_image(0, (200, 200)) is None  # Has to be resampled
+    assert renderer.extract_image(0, (300, 300), "gray") is None
+    assert renderer.extract_image(1, (300, 300)) is None
+    assert renderer.extract_image(2, (300, 300)) is None
+
+
+@pytest.mark.parametrize(
+    "colorspace, passed",
+    [
+        ("/DeviceGray", True),
+        ("[/ICCBased 0 0 R]", True),
+        ("[/Separation /Black /DeviceCMYK 0 0 R]", False),
+        ("[/Lab << /WhitePoint [0.9505 1 1.089] >>]", False),
+    ],
+)
+def test_extract_image_colorspace(tmp_path, colorspace, passed):
+    image = io.BytesIO()
+    PIL.Image.radial_gradient("L").save(image, "JPEG")
+    doc = pymupdf.Document()
+    page = doc.new_page(width=128, height=128)
+    xref = page.insert_image(page.rect, stream=image.getvalue())
+    if "0 0 R" in colorspace:
+        # A stream for the function of the separation, or the profile of ICC based
+        stream = doc.get_new_xref()
+        doc.update_object(stream, "<< /N 1 /Alternate /DeviceGray >>")
+        doc.update_stream(stream, b"0")
+        colorspace = colorspace.replace("0 0 R", f"{stream} 0 R")
+    doc.xref_set_key(xref, "ColorSpace", colorspace)
+    doc.save(tmp_path / "scan.pdf")
+
+    extracted = MuPDFRenderer(tmp_path / "scan.pdf").extract_image(0, (300, 300))
+    assert (extracted is not None) == passed
@@ -38,3 +38,156 @@ def test_out_of_range(pil_renderer: PILRenderer):
 def test_file_exists():
     with pytest.raises(FileNotFoundError):
         renderer = PILRenderer("asbsladoibibqwiogriobibhgioiovhaoivhgiovhgiovhari.png")
+
+
+def test_render_many(pil_renderer: PILRenderer):
+    pixmaps = list(pil_renderer.render_many([0, 0], (64, 64)))
+    assert len(pixmaps) == 2
+    assert pixmaps[1].samples == pil_renderer.render(0, (64, 64)).samples
+    with pytest.raises(IndexError):
+        list(pil_renderer.render_many([0, 1], (64, 64)))
+
+
+def test_render_decoded_cache(tmp_path, monkeypatch):
+    from homepress.renderer import pil_renderer
+
+    monkeypatch.setattr(PILRenderer, "decoded_cache_bytes", 2**27)
+    path = tmp_path / "scan.jpg"
+    PIL.Image.radial_gradient("L").resize((2000, 1000)).save(path)
+    renderer = PILRenderer(path)
+
+    def decoded(path=path):
+        return [x for k, x in pil_renderer._decoded_images.items() if k[0] == str(path)]
+
+    # Decoded at a reduced scale, just large enough for the render
+    assert renderer.render_preview(0).width == 420
+    assert decoded()[0].size == (500, 250)
+
+    assert renderer.render(0, (1000, 1000)).width == 1000
+    (im,) = decoded()
+    assert im.size == (1000, 500)
+
+    # Smaller renders reuse the decoded image, also after the file is closed
+    assert renderer.render(0, (300, 300)).width == 300
+    assert renderer.render_preview(0).width == 420
+    assert list(renderer.render_many([0], (200, 200)))[0].width == 200
+    assert decoded() == [im] and decoded()[0] is im
+
+    monkeypatch.setattr(PILRenderer, "decoded_cache_bytes", 0)
+    other = tmp_path / "other.jpg"
+    PIL.Image.radial_gradient("L").save(other)
+    PILRenderer(other).render(0, (100, 100))
+    assert decoded(other) == []
+
+
+@pytest.mark.parametrize(
+    "mode, n", [("RGB", 3), ("L", 1), ("RGBA", 3), ("LA", 1), ("CMYK", 3)]
+)
+def test_pil_to_pixmap(mode, n):
+    from homepress.renderer.pil_renderer import _pil_to_pixmap
+
+    im = PIL.Image.new("RGBA", (4, 2), (255, 0, 0, 255))
+    im.putpixel((0, 0), (0, 0, 0, 0))  # Transparent areas become white
+    im.putpixel((1, 0), (0, 0, 0, 128))
+    pixmap = _pil_to_pixmap(im.convert(mode))
+    assert (pixmap.n, pixmap.alpha) == (n, 0)
+    assert pixmap.pixel(0, 0) == ((255,) * n if "A" in mode else (0,) * n)
+    assert pixmap.pixel(1, 0) == ((127,) * n if "A" in mode else (0,) * n)
+
+
+@pytest.mark.parametrize("decoded_cache_bytes", [0, 2**27])
+@pytest.mark.parametrize("ext", ["tiff", "gif"])
+def test_render_frames(tmp_path, monkeypatch, ext, decoded_cache_bytes):
+    monkeypatch.setattr(PILRenderer, "decoded_cache_bytes", decoded_cache_bytes)
+    path = tmp_path / f"scan.{ext}"
+    colors = ["red", "green", "blue", "yellow", "white"]
+    frames = [PIL.Image.new("RGB", (40, 20), x) for x in colors]
+    frames[0].save(path, save_all=True, append_images=frames[1:])
+    renderer = PILRenderer(path)
+    assert len(renderer) == 5
+
+    def color(pixmap):
+        return pixmap.pixel(0, 0)
+
+    assert color(renderer.render(3, (40, 40))) == (255, 255, 0)
+    pixmaps = renderer.render_many([4, 1, 2, 2, 0], (20, 20))
+    assert list(map(color, pixmaps)) == [
+        (255, 255, 255),
+        (0, 128, 0),
+        (0, 0, 255),
+        (0, 0, 255),
+        (255, 0, 0),
+    ]
+    # Cached frames aren't changed by decoding the following frames
+    assert list(map(color, renderer.render_many(range(5), (20, 20)))) == [
+        (255, 0, 0),
+        (0, 128, 0),
+        (0, 0, 255),
+        (255, 255, 0),
+        (255, 255, 255),
+    ]
+    with pytest.raises(IndexError):
+        renderer.render(5, (40, 40))
+
+
+@pytest.mark.parametrize("colorspace", ["gray", "mono"])
+def test_render_colorspace(tmp_path, colorspace):
+    path = tmp_path / "scan.jpg"
+    PIL.Image.radial_gradient("L").convert("RGB").save(path)
+    renderer = PILRenderer(path)
+    color = renderer.render(0, (64, 64))
+    pixmap = renderer.render(0, (64, 64), colorspace)
+    assert (pixmap.n, pixmap.alpha) == (1, 0)
+    if colorspace == "mono":
+        assert set(pixmap.samples) == {0, 255}
+
+    # The image decoded in grayscale is not reused for color renders
+    assert renderer.render(0, (64, 64)).n == color.n == 3
+
+
+def test_native_size(tmp_path):
+    path = tmp_path / "scan.tiff"
+    frames = [PIL.Image.new("RGB", x, "white") for x in [(40, 20), (30, 60)]]
+    frames[0].save(path, save_all=True, append_images=frames[1:])
+    renderer = PILRenderer(path)
+    assert renderer.native_size(0) == (40, 20)
+    assert renderer.native_size(1) == (30, 60)
+    with pytest.raises(IndexError):
+        renderer.native_size(2)
+
+
+def _oriented_image(path, orientation):
+    # Red top row as stored, the image is upright after applying the orientation
+    im = PIL.Image.new("RGB", (40, 20), "white")
+    im.paste((255, 0, 0), (0, 0, 40, 2))
+    exif = PIL.Image.Exif()
+    exif[0x0112] = orientation
+    im.save(path, exif=exif, quality=95)
+
+
+def test_render_orientation(tmp_path):
+    _oriented_image(tmp_path / "photo.jpg", 6)  # Rotated 90 degrees clockwise to show
+    renderer = PILRenderer(tmp_path / "photo.jpg")
+    assert renderer.native_size(0) == (20, 40)
+
+    pixmap = renderer.render(0, (64, 64))
+    assert (pixmap.width, pixmap.height) == (20, 40)
+    assert pixmap.pixel(19, 20)[1] < 64  # Red on the right
+    assert pixmap.pixel(0, 20)[1] > 192
+
+
+def test_extract_image(tmp_path):
+    _oriented_image(tmp_path / "photo.jpg", 6)
+    renderer = PILRenderer(tmp_path / "photo.jpg")
+    image = renderer.extract_image(0, (64, 64))
+    assert image.data == (tmp_path / "photo.jpg").read_bytes()
+    assert (image.width, image.height, image.rotate) == (40, 20, 270)
+    assert image.size == (20, 40)
+
+    assert renderer.extract_image(0, (10, 10)) is None  # Has to be downscaled
+    assert renderer.extract_image(0, (64, 64), "gray") is None
+
+    _oriented_image(tmp_path / "mirrored.jpg", 2)
+    assert PILRenderer(tmp_path / "mirrored.jpg").extract_image(0, (64, 64)) is None
+    _oriented_image(tmp_path / "photo.png", 1)
+    assert PILRenderer(tmp_path / "photo.png").extract_image(0, (64, 64)) is None
@@ -0,0 +1,81 @@
+import io
+import os
+import zlib
+from pathlib import Path
+
+import pymupdf
+import pytest
+
+from homepress.embed import insert_encoded
+from homepress.renderer.renderer_abc import EncodedImage
+from homepress.writer import PDFWriter
+
+
+def _document(pages):
+    doc = pymupdf.Document()
+    for _ in range(pages):
+        doc.new_page()
+    return doc
+
+
+def test_writer_append(tmpdir: Path):
+    with PDFWriter(tmpdir / "writer_test.pdf") as writer:
+        for x in (1, 3, 2):
+            writer.append(_document(x))
+
+    assert pymupdf.open(str(tmpdir / "writer_test.pdf")).page_count == 6
+
+
+def test_writer_stream():
+    output = io.BytesIO()
+    with PDFWriter(output) as writer:
+        writer.append(_document(2))
+        writer.append(_document(2))
+
+    assert pymupdf.open(stream=output, filetype="pdf").page_count == 4
+
+
+def test_writer_shared_images(tmpdir: Path):
+    # Encoded like the rendered pages of `Press`, random data doesn't compress
+    images = [
+        EncodedImage(64, 64, "DeviceGray", 8, "FlateDecode", zlib.compress(x))
+        for x in [os.urandom(4096), os.urandom(4096)]
+    ]
+
+    def document(pages, vector=False):
+        doc = pymupdf.Document()
+        for x in pages:
+            page = doc.new_page(width=64, height=64)
+            insert_encoded(page, page.rect, images[x])
+        if not vector:
+            return doc
+
+        # The images are placed within forms
+        shown = pymupdf.Document()
+        for x in range(doc.page_count):
+            shown.new_page(width=64, height=64).show_pdf_page(page.rect, doc, x)
+        return shown
+
+    order = [0, 1, 1, 1, 0, 0, 1]
+    with PDFWriter(tmpdir / "writer_test.pdf") as writer:
+        writer.append(document(order[:2]))
+        writer.append(document(order[2:5]))
+        writer.append(document(order[5:], vector=True))
+
+    with pymupdf.open(str(tmpdir / "writer_test.pdf")) as doc:
+        assert len({x[0] for page in doc for x in page.get_images(full=True)}) == 2
+        samples = [page.get_pixmap(colorspace=pymupdf.csGRAY).samples for page in doc]
+        assert samples == [samples[x] for x in order]
+        assert samples[0] != samples[1]
+
+    # The copies aren't stored
+    assert os.path.getsize(tmpdir / "writer_test.pdf") < 3 * len(images[0].data)
+
+
+def test_writer_discard_on_error(tmpdir: Path):
+    with pytest.raises(RuntimeError):
+        with PDFWriter(tmpdir / "writer_test.pdf") as writer:
+            writer.append(_document(1))
+            raise RuntimeError()
+
+    assert not (tmpdir / "writer_test.pdf").exists()